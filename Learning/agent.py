@@ -99,6 +99,7 @@ class Agent:
         state = self.get_state(env)
         action_idx = self.choose_action(state)
         prev_energy = self.energy
+        old_x, old_y = self.x, self.y
 
         action = ACTIONS[action_idx]
         if action == "move_random":
@@ -128,6 +129,9 @@ class Agent:
 
         # wait = do nothing
 
+        if (self.x, self.y) != (old_x, old_y):
+            env.moved(self, old_x, old_y)
+
         # Energy costs & gains
         self.energy -= ENERGY_LOSS_PER_STEP
         if env.try_eat(self):
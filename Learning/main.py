@@ -6,6 +6,7 @@ import math
 import pygame
 from pygame import mixer
 from config import *
+import numpy as np
 from agent import Orc, Dwarf, log_lines
 
 pygame.init()
@@ -55,29 +56,150 @@ last_resource_spawn = 0
 kill_particles = []
 
 # RL environment wrapper
+INDEX_BUCKET = 4  # side length (in cells) of one spatial-grid bucket
+
+
+def species_of(agent):
+    return "Orc" if isinstance(agent, Orc) else "Dwarf"
+
+
 class RLEnv:
+    """Perception for the Q-learners.
+
+    Positions are indexed once per tick (per-species arrays plus a bucket
+    grid) and nearest-target answers are memoized per agent and query.
+    Queries with a ``radius`` only see targets within that Manhattan distance
+    and only touch the buckets covering it.  Each
+    index carries a version that is bumped whenever one of its members moves,
+    is born or a resource is eaten, which invalidates the cached answers.
+    """
+
     def __init__(self, agents, resource_nodes):
         self.agents = agents
         self.resource_nodes = resource_nodes
+        self.n_buckets = -(-GRID_SIZE // INDEX_BUCKET)
+        self.version = {"food": 0, "Orc": 0, "Dwarf": 0}
+        self.begin_tick()
+
+    # ─── Index maintenance ───────────────────────────────────────────────
+
+    def begin_tick(self):
+        """Rebuild every index from the live world state."""
+        self.cache = {}
+        self.members = {"Orc": [], "Dwarf": []}
+        for a in self.agents:
+            if a.alive:
+                self.members[species_of(a)].append(a)
+        self.slot = {}
+        self.pos = {}
+        self.grid = {}
+        for species, members in self.members.items():
+            self.pos[species] = np.array([(a.x, a.y) for a in members],
+                                         dtype=np.int32).reshape(-1, 2)
+            self.grid[species] = {}
+            for i, a in enumerate(members):
+                self.slot[id(a)] = (species, i)
+                self._bucket(species, a.x, a.y).append(i)
+            self.version[species] += 1
+        self._index_food()
+
+    def _index_food(self):
+        self.pos["food"] = np.array(self.resource_nodes,
+                                    dtype=np.int32).reshape(-1, 2)
+        self.grid["food"] = {}
+        for i, (x, y) in enumerate(self.resource_nodes):
+            self._bucket("food", x, y).append(i)
+        self.version["food"] += 1
+
+    def _bucket(self, key, x, y):
+        cell = (x // INDEX_BUCKET, y // INDEX_BUCKET)
+        return self.grid[key].setdefault(cell, [])
+
+    def moved(self, agent, old_x, old_y):
+        """Update the index after ``agent`` left ``(old_x, old_y)``."""
+        species, i = self.slot[id(agent)]
+        self.pos[species][i] = (agent.x, agent.y)
+        if (old_x // INDEX_BUCKET, old_y // INDEX_BUCKET) != (
+            agent.x // INDEX_BUCKET, agent.y // INDEX_BUCKET
+        ):
+            self._bucket(species, old_x, old_y).remove(i)
+            self._bucket(species, agent.x, agent.y).append(i)
+        self.version[species] += 1
+
+    def _add(self, agent):
+        species = species_of(agent)
+        i = len(self.members[species])
+        self.members[species].append(agent)
+        self.pos[species] = np.vstack([self.pos[species], (agent.x, agent.y)])
+        self.slot[id(agent)] = (species, i)
+        self._bucket(species, agent.x, agent.y).append(i)
+        self.version[species] += 1
+
+    # ─── Queries ─────────────────────────────────────────────────────────
 
     def find_nearest(self, agent, food=False, species=None, radius=None):
-        if food:
-            if not self.resource_nodes: return None
-            return min(self.resource_nodes,
-                       key=lambda pos: abs(pos[0]-agent.x)+abs(pos[1]-agent.y))
-        if species:
-            candidates = [a2 for a2 in self.agents
-                          if a2.alive and ((species=="Orc" and isinstance(a2,Orc))
-                                           or (species=="Dwarf" and isinstance(a2,Dwarf)))]
-            if not candidates: return None
-            best = min(candidates, key=lambda a2: abs(a2.x-agent.x)+abs(a2.y-agent.y))
-            return (best.x, best.y)
-        return None
+        key = "food" if food else species
+        if key is None:
+            return None
+        memo = (id(agent), agent.x, agent.y, key, radius)
+        hit = self.cache.get(memo)
+        if hit is not None and hit[0] == self.version[key]:
+            return hit[1]
+        if radius is None:
+            i = self._search(key, agent.x, agent.y)
+        else:
+            i = self._search_radius(key, agent.x, agent.y, radius)
+        best = None if i is None else tuple(int(v) for v in self.pos[key][i])
+        self.cache[memo] = (self.version[key], best)
+        return best
+
+    def _search(self, key, x, y):
+        """Ring search over grid buckets; ties resolve to list order."""
+        grid, pos = self.grid[key], self.pos[key]
+        qx, qy = x // INDEX_BUCKET, y // INDEX_BUCKET
+        best_i, best_d = None, None
+        for k in range(self.n_buckets):
+            ring = []
+            for bx in range(qx - k, qx + k + 1):
+                for by in range(qy - k, qy + k + 1):
+                    if max(abs(bx - qx), abs(by - qy)) == k:
+                        ring.extend(grid.get((bx, by), ()))
+            if ring:
+                ring.sort()
+                d = np.abs(pos[ring] - (x, y)).sum(axis=1)
+                j = int(np.argmin(d))
+                if best_d is None or d[j] < best_d or (
+                    d[j] == best_d and ring[j] < best_i
+                ):
+                    best_i, best_d = ring[j], int(d[j])
+            # every bucket of the next ring is at least k*B+1 cells away
+            if best_d is not None and best_d <= k * INDEX_BUCKET:
+                break
+        return best_i
+
+    def _search_radius(self, key, x, y, radius):
+        """Nearest member within Manhattan ``radius``, scanning only the
+        buckets overlapping the vision square."""
+        grid, pos = self.grid[key], self.pos[key]
+        last = self.n_buckets - 1
+        cands = []
+        for bx in range(max(0, (x - radius) // INDEX_BUCKET),
+                        min(last, (x + radius) // INDEX_BUCKET) + 1):
+            for by in range(max(0, (y - radius) // INDEX_BUCKET),
+                            min(last, (y + radius) // INDEX_BUCKET) + 1):
+                cands.extend(grid.get((bx, by), ()))
+        if not cands:
+            return None
+        cands.sort()
+        d = np.abs(pos[cands] - (x, y)).sum(axis=1)
+        j = int(np.argmin(d))
+        return cands[j] if d[j] <= radius else None
 
     def try_eat(self, agent):
         pos = (agent.x, agent.y)
         if pos in self.resource_nodes:
             self.resource_nodes.remove(pos)
+            self._index_food()
             return True
         return False
 
@@ -91,6 +213,7 @@ class RLEnv:
             agent.energy = cost
             child = Dwarf(agent.x, agent.y, child_energy)
         self.agents.append(child)
+        self._add(child)
         if repro_sound:
             repro_sound.play()
 
@@ -251,6 +374,7 @@ def draw_game_over():
 
 # start
 switch_roles()
+env = RLEnv(agents, resource_nodes)
 
 running = True
 while running:
@@ -282,7 +406,7 @@ while running:
         update_weather()
 
         # Q-learning step
-        env = RLEnv(agents, resource_nodes)
+        env.begin_tick()
         for a in agents:
             if a.alive:
                 a.act(env, episode=1, turn=turn_counter)
@@ -1,7 +1,7 @@
 # agent.py
 
 import random
-import pygame
+import numpy as np
 from config import *
 
 
@@ -12,6 +12,14 @@ def mutate_trait(value, minimum, maximum):
         value = max(minimum, min(maximum, value + change))
     return value
 
+
+def mutate_traits(values, minimum, maximum, rng):
+    """Array version of ``mutate_trait`` drawing from the NumPy generator
+    ``rng``; ``minimum`` and ``maximum`` may be per-value arrays."""
+    change = values * MUTATION_AMOUNT * rng.choice((-1, 1), values.shape)
+    mutate = rng.random(values.shape) < MUTATION_RATE
+    return np.where(mutate, np.clip(values + change, minimum, maximum), values)
+
 class Agent:
     """Base class for all moving entities."""
 
@@ -21,13 +29,10 @@ class Agent:
         self.alive = True
         self.is_predator = False
         self.energy = energy
-        self.pos_x = x * CELL_SIZE
-        self.pos_y = y * CELL_SIZE
 
         # Fallback traits
         self.speed = speed if speed is not None else random.uniform(MIN_SPEED, MAX_SPEED)
         self.age = 0
-        self.trail = []
         self.vision_radius = (
             vision_radius
             if vision_radius is not None
@@ -35,6 +40,8 @@ class Agent:
         )
         # record actions taken for simple learning mechanism
         self.action_history = []
+        # id in main.py's lineage record, -1 until registered
+        self.lineage_id = -1
 
     def move_random(self, obstacles=None):
         """Move to a random neighbouring cell avoiding obstacles."""
@@ -89,36 +96,17 @@ class Agent:
             else:
                 new_x, new_y = self.x, self.y
         self.x, self.y = new_x, new_y
-        self.trail.append((self.pos_x, self.pos_y))
-        if len(self.trail) > TRAIL_LENGTH:
-            self.trail.pop(0)
 
     def distance_to(self, other):
         """Manhattan distance to another agent."""
         return abs(self.x - other.x) + abs(self.y - other.y)
 
-    def update_animation(self):
-        """Smoothly animate toward the grid position."""
-        target_x = self.x * CELL_SIZE
-        target_y = self.y * CELL_SIZE
-        self.pos_x += (target_x - self.pos_x) / ANIMATION_STEPS
-        self.pos_y += (target_y - self.pos_y) / ANIMATION_STEPS
-
     def update_age_energy_trail(self):
         """Update age and check natural death."""
         self.age += 1
         if self.age > MAX_AGE:
             self.alive = False
 
-    def draw_trail(self, screen):
-        """Render fading trail behind the agent."""
-        for i, (tx, ty) in enumerate(self.trail):
-            alpha = int(255 * (i / len(self.trail))) if self.trail else 0
-            surf = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
-            color = DWARF_COLOR if not self.is_predator else ORC_COLOR
-            surf.fill((*color, alpha))
-            screen.blit(surf, (tx, ty))
-
 class Orc(Agent):
     """Predator unit."""
 
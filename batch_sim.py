@@ -0,0 +1,393 @@
+# batch_sim.py
+
+import sys
+import time
+import numpy as np
+from config import *
+from agent import mutate_traits
+
+# Heuristic behaviours in the order of the weight table columns
+BEHAVIOURS = ("seek_food", "hunt", "flee", "wander")
+SEEK, HUNT, FLEE, WANDER = range(4)
+# Unit moves _move falls back to when the target cell is an obstacle
+FALLBACK_MOVES = np.array([(-1, 0), (1, 0), (0, -1), (0, 1), (0, 0)])
+AGENT_FIELDS = ("x", "y", "energy", "alive", "is_orc", "speed", "vision", "age")
+# winner codes
+RUNNING, DRAW, ORCS_WIN, DWARVES_WIN = -1, 0, 1, 2
+
+
+class BatchSimulation:
+    """``num_worlds`` independent copies of the main.py world, stepped
+    together without rendering.
+
+    Every world has its own obstacles, resource nodes, agents, weather and
+    day/night state; agent data lives in ``(num_worlds, capacity)`` arrays
+    with an ``alive`` mask and grid arrays are indexed ``[world, x, y]``.
+    Dead slots are reused for newborns, ``capacity`` doubles when a world
+    runs out and halves again once every world fits in a quarter of it
+    (pairwise rules cost ``capacity**2`` per world).  A tick applies the
+    rules of main.py with the heuristic controller to all worlds at once;
+    agents move simultaneously rather than one after another, so ties (two
+    agents reaching one resource, several predators on one prey) go to the
+    lowest slot.  Once a world's game is over its final counts are kept and
+    its agents are cleared.
+    """
+
+    def __init__(self, num_worlds, capacity=NUM_ORCS + NUM_DWARVES, seed=None, weights=None, grid_size=GRID_SIZE):
+        self.num_worlds = num_worlds
+        self.grid_size = grid_size
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        # behaviour weights per species (row 0 orcs, row 1 dwarves)
+        weights = weights or {}
+        self.weights = np.array([[weights.get(s, {}).get(b, 1.0) for b in BEHAVIOURS]
+                                 for s in ("orc", "dwarf")])
+        self.low_energy = np.array([REPRODUCTION_THRESHOLD, DWARF_REPRODUCTION_THRESHOLD]) * LOW_ENERGY_RATIO
+        self.reset()
+
+    # ------------------------------------------------------------------
+    def reset(self):
+        w, n, g = self.num_worlds, self.capacity, self.grid_size
+        self.x = np.zeros((w, n), dtype=np.int64)
+        self.y = np.zeros((w, n), dtype=np.int64)
+        self.energy = np.zeros((w, n))
+        self.alive = np.zeros((w, n), dtype=bool)
+        self.is_orc = np.zeros((w, n), dtype=bool)
+        self.speed = np.zeros((w, n))
+        self.vision = np.zeros((w, n))
+        self.age = np.zeros((w, n), dtype=np.int64)
+        self.obstacles = np.zeros((w, g, g), dtype=bool)
+        self.resources = np.zeros((w, RESOURCE_NODE_COUNT, 2), dtype=np.int64)
+        self.has_resource = np.zeros((w, RESOURCE_NODE_COUNT), dtype=bool)
+        self.turn = 0
+        self.day = np.zeros(w, dtype=bool)  # main.py starts with switch_roles()
+        self.weather = np.zeros(w, dtype=np.int64)
+        self.last_weather_change = 0
+        self.last_resource_spawn = 0
+        self.done = np.zeros(w, dtype=bool)
+        self.winner = np.full(w, RUNNING, dtype=np.int64)
+        self.end_turn = np.zeros(w, dtype=np.int64)
+        self.final_orcs = np.zeros(w, dtype=np.int64)
+        self.final_dwarves = np.zeros(w, dtype=np.int64)
+        self.orc_deaths = np.zeros(w, dtype=np.int64)
+        self.dwarf_deaths = np.zeros(w, dtype=np.int64)
+        self.births = np.zeros(w, dtype=np.int64)
+
+        worlds, ox, oy = self._random_cells(np.full(w, OBSTACLE_COUNT))
+        self.obstacles[worlds, ox, oy] = True
+        self._respawn_resources(np.ones(w, dtype=bool))
+        for orc, count, energy in ((True, NUM_ORCS, INITIAL_PREDATOR_ENERGY),
+                                   (False, NUM_DWARVES, INITIAL_PREY_ENERGY)):
+            worlds, x, y = self._random_cells(np.full(w, count))
+            self._spawn(worlds, x, y, orc, energy)
+
+    def _random_cells(self, counts):
+        """Distinct random free cells, ``counts[w]`` of them in world ``w``,
+        as ``(world, x, y)`` arrays."""
+        g = self.grid_size
+        occupied = self.obstacles.reshape(self.num_worlds, -1).copy()
+        rw, rr = np.nonzero(self.has_resource)
+        occupied[rw, self.resources[rw, rr, 0] * g + self.resources[rw, rr, 1]] = True
+        aw, an = np.nonzero(self.alive)
+        occupied[aw, self.x[aw, an] * g + self.y[aw, an]] = True
+        scores = self.rng.random(occupied.shape)
+        scores[occupied] = 2.0
+        order = np.argsort(scores, axis=1)
+        take = np.arange(g * g)[None, :] < np.asarray(counts)[:, None]
+        cells = order[take]
+        return np.nonzero(take)[0], cells // g, cells % g
+
+    def _add(self, worlds, **fields):
+        """Put new agents into free slots of ``worlds`` (one entry each)."""
+        per_world = np.bincount(worlds, minlength=self.num_worlds)
+        deficit = (per_world - (~self.alive).sum(axis=1)).max()
+        if deficit > 0:
+            grow = max(self.capacity, deficit)
+            for name in AGENT_FIELDS:
+                old = getattr(self, name)
+                setattr(self, name, np.concatenate(
+                    [old, np.zeros((self.num_worlds, grow), dtype=old.dtype)], axis=1))
+            self.capacity += grow
+        free = np.argsort(self.alive, axis=1, kind="stable")
+        by_world = np.argsort(worlds, kind="stable")
+        starts = np.cumsum(per_world) - per_world
+        rank = np.empty(len(worlds), dtype=np.int64)
+        rank[by_world] = np.arange(len(worlds)) - starts[worlds[by_world]]
+        slots = free[worlds, rank]
+        for name, values in fields.items():
+            getattr(self, name)[worlds, slots] = values
+        self.alive[worlds, slots] = True
+        self.age[worlds, slots] = 0
+
+    def _shrink(self):
+        """Move the living agents to the front and halve the capacity while
+        the fullest world uses at most a quarter of it."""
+        need = self.alive.sum(axis=1).max()
+        if self.capacity < 8 or need > self.capacity // 4:
+            return
+        order = np.argsort(~self.alive, axis=1, kind="stable")[:, :self.capacity // 2]
+        for name in AGENT_FIELDS:
+            setattr(self, name, np.take_along_axis(getattr(self, name), order, axis=1))
+        self.capacity //= 2
+
+    def _spawn(self, worlds, x, y, orc, energy):
+        """New agents with random species traits, like ``Orc``/``Dwarf``."""
+        k = len(worlds)
+        if orc:
+            speed = self.rng.uniform(ORC_MIN_SPEED, ORC_MAX_SPEED, k)
+            vision = self.rng.integers(ORC_MIN_VISION_RADIUS, ORC_MAX_VISION_RADIUS + 1, k)
+        else:
+            speed = self.rng.uniform(DWARF_MIN_SPEED, DWARF_MAX_SPEED, k)
+            vision = self.rng.integers(DWARF_MIN_VISION_RADIUS, DWARF_MAX_VISION_RADIUS + 1, k)
+        self._add(worlds, x=x, y=y, energy=energy, is_orc=orc, speed=speed, vision=vision)
+
+    # ------------------------------------------------------------------
+    def step(self):
+        """Advance every running world by one turn."""
+        active = ~self.done
+        self.turn += 1
+        interval = REINFORCEMENT_INTERVAL * (1 + self.turn // 500)
+        if self.turn % interval == 0:
+            self._reinforce(active)
+        if self.turn % DAY_DURATION == 0:
+            self.day[active] = ~self.day[active]
+        if self.turn - self.last_weather_change >= WEATHER_CHANGE_INTERVAL:
+            draw = self.rng.integers(len(WEATHER_STATES), size=self.num_worlds)
+            self.weather[active] = draw[active]
+            self.last_weather_change = self.turn
+        self._update_agents(active)
+        self._interact(active)
+        self._reproduce(active)
+        if self.turn - self.last_resource_spawn >= RESOURCE_NODE_RESPAWN_INTERVAL:
+            self._respawn_resources(active)
+            self.last_resource_spawn = self.turn
+        self._check_game_over(active)
+        self._shrink()
+
+    def run(self, max_turns=MAX_TURNS):
+        """Step until every game is over (or ``max_turns``); returns ``results()``."""
+        while not self.done.all() and self.turn < max_turns:
+            self.step()
+        return self.results()
+
+    def results(self):
+        orcs = (self.alive & self.is_orc).sum(axis=1)
+        dwarves = (self.alive & ~self.is_orc).sum(axis=1)
+        return {
+            "winner": self.winner.copy(),
+            "turns": np.where(self.done, self.end_turn, self.turn),
+            "orcs_alive": np.where(self.done, self.final_orcs, orcs),
+            "dwarves_alive": np.where(self.done, self.final_dwarves, dwarves),
+            "orc_deaths": self.orc_deaths.copy(),
+            "dwarf_deaths": self.dwarf_deaths.copy(),
+            "births": self.births.copy(),
+        }
+
+    # ------------------------------------------------------------------
+    def _reinforce(self, active):
+        self.energy[self.alive & active[:, None]] += REINFORCEMENT_ENERGY_BOOST
+        for orc, count, energy in ((True, REINFORCEMENT_NEW_ORCS, INITIAL_PREDATOR_ENERGY),
+                                   (False, REINFORCEMENT_NEW_DWARVES, INITIAL_PREY_ENERGY)):
+            worlds, x, y = self._random_cells(np.where(active, count, 0))
+            self._spawn(worlds, x, y, orc, energy)
+
+    def _respawn_resources(self, active):
+        missing = ~self.has_resource & active[:, None]
+        worlds, x, y = self._random_cells(missing.sum(axis=1))
+        rw, rr = np.nonzero(missing)
+        self.resources[rw, rr, 0] = x
+        self.resources[rw, rr, 1] = y
+        self.has_resource[rw, rr] = True
+
+    def _free(self, worlds, x, y):
+        return ~self.obstacles[worlds, x % self.grid_size, y % self.grid_size]
+
+    def _move(self, live, dx, dy):
+        """``Agent._move`` for every live agent at once."""
+        g = self.grid_size
+        worlds = np.arange(self.num_worlds)[:, None]
+        nx = np.trunc(self.x + dx * self.speed).astype(np.int64) % g
+        ny = np.trunc(self.y + dy * self.speed).astype(np.int64) % g
+        blocked = live & ~self._free(worlds, nx, ny)
+        if blocked.any():
+            bw, bn = np.nonzero(blocked)
+            fx = (self.x[bw, bn, None] + FALLBACK_MOVES[:, 0]) % g
+            fy = (self.y[bw, bn, None] + FALLBACK_MOVES[:, 1]) % g
+            scores = self.rng.random(fx.shape)
+            scores[~self._free(bw[:, None], fx, fy)] = -1.0
+            pick = scores.argmax(axis=1)
+            rows = np.arange(len(bw))
+            stuck = scores[rows, pick] < 0
+            nx[bw, bn] = np.where(stuck, self.x[bw, bn], fx[rows, pick])
+            ny[bw, bn] = np.where(stuck, self.y[bw, bn], fy[rows, pick])
+        self.x = np.where(live, nx, self.x)
+        self.y = np.where(live, ny, self.y)
+
+    def _random_steps(self):
+        """Directions chosen like ``Agent.move_random``: the first of five
+        random tries whose target is free, else the last try."""
+        worlds = np.arange(self.num_worlds)[:, None]
+        tries = self.rng.integers(-1, 2, size=(5,) + self.x.shape + (2,))
+        dx, dy = tries[4, ..., 0], tries[4, ..., 1]
+        for t in range(3, -1, -1):
+            tx = np.trunc(self.x + tries[t, ..., 0] * self.speed).astype(np.int64)
+            ty = np.trunc(self.y + tries[t, ..., 1] * self.speed).astype(np.int64)
+            ok = self._free(worlds, tx, ty)
+            dx = np.where(ok, tries[t, ..., 0], dx)
+            dy = np.where(ok, tries[t, ..., 1], dy)
+        return dx, dy
+
+    @staticmethod
+    def _nearest(pos, targets, valid):
+        """Manhattan offset and distance from every agent to its nearest
+        valid target, per world; ``inf`` distance when there is none."""
+        delta = targets[:, None, :, :] - pos[:, :, None, :]
+        dist = np.where(valid, np.abs(delta).sum(axis=-1), np.inf)
+        idx = dist.argmin(axis=2)
+        best = np.take_along_axis(dist, idx[..., None], axis=2)[..., 0]
+        offset = np.take_along_axis(delta, idx[..., None, None], axis=2)[:, :, 0]
+        return offset, best
+
+    def _update_agents(self, active):
+        live = self.alive & active[:, None]
+        self.age[live] += 1
+        old = live & (self.age > MAX_AGE)
+        self.alive &= ~old
+        live &= ~old
+
+        predator = self.is_orc == self.day[:, None]
+        pos = np.stack([self.x, self.y], axis=-1)
+        res_delta, res_dist = self._nearest(pos, self.resources, self.has_resource[:, None, :])
+        enemies = live[:, None, :] & (predator[:, :, None] != predator[:, None, :])
+        enemy_delta, enemy_dist = self._nearest(pos, pos, enemies)
+
+        # weighted choice among the applicable behaviours (HeuristicController)
+        species = (~self.is_orc).astype(np.int64)
+        in_sight = enemy_dist <= self.vision
+        options = np.stack([
+            (self.energy <= self.low_energy[species]) & self.has_resource.any(axis=1)[:, None],
+            in_sight & predator,
+            in_sight & ~predator,
+            np.ones_like(live),
+        ], axis=-1)
+        weight = np.where(options, self.weights[species], 0.0)
+        cumulative = weight.cumsum(axis=-1)
+        r = self.rng.random(live.shape) * cumulative[..., -1]
+        choice = (cumulative < r[..., None]).sum(axis=-1).clip(max=WANDER)
+
+        dx, dy = self._random_steps()
+        seek = choice == SEEK
+        dx = np.where(seek, np.sign(res_delta[..., 0]), dx)
+        dy = np.where(seek, np.sign(res_delta[..., 1]), dy)
+        storm = WEATHER_STATES.index("storm")
+        slowed = (self.weather[:, None] == storm) & (self.rng.random(live.shape) < STORM_MOVEMENT_SLOWDOWN)
+        hunt = (choice == HUNT) & ~slowed
+        flee = choice == FLEE
+        dx = np.where(hunt, np.sign(enemy_delta[..., 0]), np.where(flee, -np.sign(enemy_delta[..., 0]), dx))
+        dy = np.where(hunt, np.sign(enemy_delta[..., 1]), np.where(flee, -np.sign(enemy_delta[..., 1]), dy))
+        self._move(live, dx, dy)
+
+        extra = np.select([self.weather == WEATHER_STATES.index("rain"), self.weather == storm],
+                          [RAIN_ENERGY_LOSS_INCREASE, STORM_ENERGY_LOSS_INCREASE], 0.0)
+        mult = np.where(self.day, DAY_TEMP_MULTIPLIER, NIGHT_TEMP_MULTIPLIER)
+        base = np.where(predator, PREDATOR_ENERGY_LOSS, PREY_ENERGY_LOSS)
+        self.energy -= np.where(live, (base + extra[:, None]) * mult[:, None], 0.0)
+
+        # resources go to the lowest live slot standing on them
+        on = (live[:, :, None] & self.has_resource[:, None, :]
+              & (self.x[:, :, None] == self.resources[:, None, :, 0])
+              & (self.y[:, :, None] == self.resources[:, None, :, 1]))
+        eaten = on.any(axis=1)
+        ew, er = np.nonzero(eaten)
+        eater = on.argmax(axis=1)[ew, er]
+        gain = np.where(self.is_orc[ew, eater], 1.0, 1.5) * RESOURCE_NODE_ENERGY
+        self.energy[ew, eater] += gain
+        self.has_resource &= ~eaten
+
+        starved = live & (self.energy <= 0)
+        self.alive &= ~starved
+        self.orc_deaths += (starved & self.is_orc).sum(axis=1)
+        self.dwarf_deaths += (starved & ~self.is_orc).sum(axis=1)
+
+    def _interact(self, active):
+        """Predator/prey contests on shared cells (``check_interactions``)."""
+        live = self.alive & active[:, None]
+        predator = live & (self.is_orc == self.day[:, None])
+        prey = live & ~predator
+        same = ((self.x[:, :, None] == self.x[:, None, :])
+                & (self.y[:, :, None] == self.y[:, None, :]))
+        contest = same & predator[:, :, None] & prey[:, None, :]
+        # every predator takes on its lowest prey slot; a prey picked by
+        # several predators only fights the lowest predator slot
+        pw, pn = np.nonzero(contest.any(axis=2))
+        qn = contest.argmax(axis=2)[pw, pn]
+        chosen = np.zeros_like(contest)
+        chosen[pw, pn, qn] = True
+        keep = chosen.argmax(axis=1)[pw, qn] == pn
+        pw, pn, qn = pw[keep], pn[keep], qn[keep]
+        prob = self.energy[pw, pn] / (self.energy[pw, pn] + self.energy[pw, qn] + 1e-6)
+        win = self.rng.random(len(pw)) < prob
+
+        near = (np.abs(self.x[:, :, None] - self.x[:, None, :])
+                + np.abs(self.y[:, :, None] - self.y[:, None, :])) <= PACK_RADIUS
+        pack = (near & predator[:, None, :]).sum(axis=2) - 1
+        bonus = 1 + PACK_ENERGY_BONUS_MULTIPLIER * pack[pw[win], pn[win]]
+        self.energy[pw[win], pn[win]] += PREDATOR_ENERGY_GAIN * bonus
+
+        dead_w = np.concatenate([pw[win], pw[~win]])
+        dead_n = np.concatenate([qn[win], pn[~win]])
+        self.alive[dead_w, dead_n] = False
+        orc = self.is_orc[dead_w, dead_n]
+        np.add.at(self.orc_deaths, dead_w[orc], 1)
+        np.add.at(self.dwarf_deaths, dead_w[~orc], 1)
+
+    def _reproduce(self, active):
+        for orc in (True, False):
+            live = self.alive & active[:, None]  # the arrays may have grown
+            threshold = REPRODUCTION_THRESHOLD if orc else DWARF_REPRODUCTION_THRESHOLD
+            pw, pn = np.nonzero(live & (self.is_orc == orc) & (self.energy >= threshold))
+            if not len(pw):
+                continue
+            energy = self.energy[pw, pn]
+            if orc:
+                child = np.floor(energy / 2)
+                self.energy[pw, pn] = child
+                lo_s, hi_s = ORC_MIN_SPEED, ORC_MAX_SPEED
+                lo_v, hi_v = ORC_MIN_VISION_RADIUS, ORC_MAX_VISION_RADIUS
+            else:
+                child = np.trunc(energy * (1 - DWARF_REPRODUCTION_COST))
+                self.energy[pw, pn] = np.trunc(energy * DWARF_REPRODUCTION_COST)
+                lo_s, hi_s = DWARF_MIN_SPEED, DWARF_MAX_SPEED
+                lo_v, hi_v = DWARF_MIN_VISION_RADIUS, DWARF_MAX_VISION_RADIUS
+            self._add(pw, x=self.x[pw, pn], y=self.y[pw, pn], energy=child, is_orc=orc,
+                      speed=mutate_traits(self.speed[pw, pn], lo_s, hi_s, self.rng),
+                      vision=mutate_traits(self.vision[pw, pn], lo_v, hi_v, self.rng))
+            np.add.at(self.births, pw, 1)
+
+    def _check_game_over(self, active):
+        orcs = (self.alive & self.is_orc).sum(axis=1)
+        dwarves = (self.alive & ~self.is_orc).sum(axis=1)
+        over = active & ((orcs == 0) | (dwarves == 0) | (self.turn >= MAX_TURNS))
+        self.winner[over] = np.select(
+            [(orcs == 0) & (dwarves == 0), orcs == 0, dwarves == 0],
+            [DRAW, DWARVES_WIN, ORCS_WIN], DRAW)[over]
+        self.end_turn[over] = self.turn
+        self.final_orcs[over] = orcs[over]
+        self.final_dwarves[over] = dwarves[over]
+        self.done |= over
+        # finished worlds keep only their results, so they stop costing work
+        self.alive[over] = False
+
+
+if __name__ == "__main__":
+    worlds = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    sim = BatchSimulation(worlds)
+    start = time.perf_counter()
+    results = sim.run()
+    elapsed = time.perf_counter() - start
+    wins = np.bincount(results["winner"] + 1, minlength=4)
+    print(f"{worlds} worlds, {sim.turn} turns in {elapsed:.1f}s "
+          f"({worlds * sim.turn / elapsed:.0f} world-turns/s)")
+    print(f"Orcs win {wins[ORCS_WIN + 1]}  Dwarves win {wins[DWARVES_WIN + 1]}  "
+          f"Draws {wins[DRAW + 1]}  Unfinished {wins[RUNNING + 1]}")
+    print(f"Mean game length {results['turns'].mean():.0f} turns")
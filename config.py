@@ -12,8 +12,9 @@ WINDOW_WIDTH = GRID_SIZE * CELL_SIZE
 WINDOW_HEIGHT = GRID_SIZE * CELL_SIZE + UI_HEIGHT + CHART_HEIGHT
 WINDOW_SIZE = (WINDOW_WIDTH, WINDOW_HEIGHT)
 
-FPS = 25
-FAST_FPS = 90  # used when fast-forward is toggled
+FPS = 25  # display frame rate
+SIM_TICK_RATE = 25  # simulation turns per second, independent of FPS
+FAST_FPS = 90  # turns per second when fast-forward is toggled
 
 ORC_COLOR = (255, 0, 0)
 DWARF_COLOR = (0, 0, 255)
@@ -44,11 +45,20 @@ BACKGROUND_MUSIC = "assets/The Battle of the Pelennor Fields.mp3"
 REPRODUCTION_SOUND = "assets/reproduce.wav"
 
 SHOW_HEATMAP = False
+HEATMAP_DECAY = 0.95  # fraction of heat kept each tick
+HEATMAP_ALPHA = 160   # opacity of the hottest cell
 
 DWARF_REPRODUCTION_THRESHOLD = 50
 DWARF_REPRODUCTION_COST = 0.75
 
 RESOURCE_NODE_COUNT = 5
+# seek_food follows a shared BFS distance field around obstacles instead of
+# stepping greedily toward the nearest node
+FLOW_FIELD_NAVIGATION = True
+# "nearest": pairwise nearest-enemy search; "influence": read enemy distance
+# and direction from per-role influence maps (cost independent of population)
+PERCEPTION_MODE = "nearest"
+INFLUENCE_RADIUS = 8  # farthest enemies on the maps, at least the largest vision radius
 RESOURCE_NODE_ENERGY = 20
 RESOURCE_NODE_RESPAWN_INTERVAL = 100
 
@@ -69,6 +79,9 @@ MAX_VISION_RADIUS = 8
 
 KILL_PARTICLE_COUNT = 15
 KILL_PARTICLE_LIFETIME = 0.5
+KILL_PARTICLE_CAPACITY = 4096  # particles alive at once; further spawns are dropped
+KILL_PARTICLE_SIZE = 4
+KILL_PARTICLE_COLOR = (255, 255, 0)
 
 MINIMAP_SCALE = 0.2
 MINIMAP_PADDING = 10
@@ -104,3 +117,35 @@ DWARF_MAX_VISION_RADIUS = 6
 
 # End conditions
 MAX_TURNS = 5000
+
+# Controllers: "heuristic" (learned weights), "qlearning" or "policy"
+ORC_CONTROLLER = "heuristic"
+DWARF_CONTROLLER = "heuristic"
+# Trained orc_dwarf_rl policies (.zip for RLAgent, .npz for NumpyPolicy)
+ORC_POLICY_PATH = "orc_dwarf_policy.npz"
+DWARF_POLICY_PATH = "orc_dwarf_policy.npz"
+# energy that maps to 1.0 in policy observations (twice the initial energy,
+# matching OrcDwarfEnv's INITIAL_ENERGY / MAX_ENERGY ratio)
+RL_ENERGY_SCALE = 80
+RL_SIGHT = 5
+
+# Q-learning controller
+ALPHA = 0.1
+GAMMA = 0.9
+EPSILON = 0.1
+MAX_ENERGY = 100
+
+# Replay recording (watch with replay_viewer.py)
+RECORD_REPLAY = False
+REPLAY_FILE = "run.replay"
+REPLAY_CHUNK_TURNS = 250  # turns per compressed chunk, each starting with a keyframe
+
+# Tiled multi-process simulation (distributed_sim.py)
+TILES_PER_SIDE = 3
+SIM_WORKERS = 4
+TILE_CAPACITY = 512  # agents per tile; extra births and arrivals are dropped
+
+# Lineage tracking (lineage.py), saved when main.py exits
+RECORD_LINEAGE = False
+LINEAGE_FILE = "lineage.npz"
+LINEAGE_HISTOGRAM_BINS = 16
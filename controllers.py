@@ -0,0 +1,266 @@
+# controllers.py
+
+import random
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+import numpy as np
+from config import *
+from agent import Orc
+
+# Behaviours update_agents knows how to carry out.
+BEHAVIOURS = ("seek_food", "hunt", "flee", "wander", "stay", "north", "south", "east", "west")
+STEPS = {"north": (0, -1), "south": (0, 1), "east": (1, 0), "west": (-1, 0)}
+
+
+class WorldView:
+    """Per-tick snapshot of the living agents with batched perception.
+
+    Nearest resource and nearest enemy (closest agent of the opposite role)
+    are computed once for everybody, so controllers and the movement code
+    only index into arrays.  When ``influence`` (an ``InfluenceMaps``) is
+    given, enemies are sensed from the influence maps of the two roles
+    instead of a pairwise search: ``enemy_dist`` is the wrapped distance up
+    to the map radius, ``enemy_dir`` the direction of the strongest
+    influence, and ``enemy_delta`` (the offset to the enemy) stays zero and
+    ``enemy`` ``None`` because the maps do not locate individual agents.
+    """
+
+    def __init__(self, agents, resource_nodes, obstacles, influence=None):
+        self.agents = [a for a in agents if a.alive]
+        self.resource_nodes = list(resource_nodes)
+        self.obstacles = obstacles
+        n = len(self.agents)
+        self.pos = np.array([(a.x, a.y) for a in self.agents], dtype=np.int64).reshape(n, 2)
+        self.energy = np.array([a.energy for a in self.agents], dtype=np.float64)
+        self.vision = np.array([a.vision_radius for a in self.agents], dtype=np.float64)
+        self.is_orc = np.array([isinstance(a, Orc) for a in self.agents], dtype=bool)
+        self.is_predator = np.array([a.is_predator for a in self.agents], dtype=bool)
+
+        res = np.array(self.resource_nodes, dtype=np.int64).reshape(-1, 2)
+        self.res_idx, self.res_dist = self._nearest(res, np.ones((n, len(res)), dtype=bool))
+        self.has_res = self.res_idx >= 0
+        self.res_delta = np.zeros_like(self.pos)
+        self.res_delta[self.has_res] = res[self.res_idx[self.has_res]] - self.pos[self.has_res]
+
+        if influence is not None:
+            self._sense(influence)
+            return
+        enemies = self.is_predator[None, :] != self.is_predator[:, None]
+        self.enemy_idx, self.enemy_dist = self._nearest(self.pos, enemies)
+        self.has_enemy = self.enemy_idx >= 0
+        self.enemy_delta = np.zeros_like(self.pos)
+        self.enemy_delta[self.has_enemy] = (
+            self.pos[self.enemy_idx[self.has_enemy]] - self.pos[self.has_enemy]
+        )
+        self.enemy_dir = np.sign(self.enemy_delta)
+
+    def _sense(self, influence):
+        """Enemy distance and direction read from the influence maps."""
+        n = len(self.agents)
+        self.enemy_idx = np.full(n, -1)
+        self.enemy_dist = np.full(n, np.inf)
+        self.enemy_delta = np.zeros_like(self.pos)
+        self.enemy_dir = np.zeros_like(self.pos)
+        cells = self.pos[:, 0] * influence.grid_size + self.pos[:, 1]
+        for predators in (True, False):
+            hunters = self.is_predator == predators
+            if not hunters.any():
+                continue
+            dist, step = influence.sense(self.pos[~hunters])
+            self.enemy_dist[hunters] = dist[cells[hunters]]
+            self.enemy_dir[hunters] = step[cells[hunters]]
+        self.has_enemy = np.isfinite(self.enemy_dist)
+
+    def _nearest(self, targets, valid):
+        """Closest valid target per agent (Manhattan, ties to list order)."""
+        n = len(self.agents)
+        if n == 0 or len(targets) == 0:
+            return np.full(n, -1), np.full(n, np.inf)
+        dist = np.abs(self.pos[:, None, :] - targets[None, :, :]).sum(axis=-1).astype(np.float64)
+        dist[~valid] = np.inf
+        idx = dist.argmin(axis=1)
+        best = dist[np.arange(n), idx]
+        idx[np.isinf(best)] = -1
+        return idx, best
+
+    def species(self, orcs):
+        """Indices of the orcs (``orcs=True``) or dwarves in this view."""
+        return np.flatnonzero(self.is_orc == orcs)
+
+    def resource(self, i):
+        return self.resource_nodes[self.res_idx[i]] if self.has_res[i] else None
+
+    def enemy(self, i):
+        return self.agents[self.enemy_idx[i]] if self.enemy_idx[i] >= 0 else None
+
+    def enemy_step(self, i):
+        """Unit ``(dx, dy)`` toward the enemy."""
+        dx, dy = self.enemy_dir[i]
+        return int(dx), int(dy)
+
+    def enemy_in_sight(self, i):
+        return self.has_enemy[i] and self.enemy_dist[i] <= self.vision[i]
+
+
+class Controller(ABC):
+    """Chooses one behaviour from ``BEHAVIOURS`` for each given agent."""
+
+    # whether the chosen behaviours feed main.update_learning's weights
+    learns_weights = False
+
+    @abstractmethod
+    def decide(self, world, idx):
+        """Behaviour names for the agents at indices ``idx`` of ``world``
+        (a ``WorldView``), in the same order."""
+
+
+class HeuristicController(Controller):
+    """Weighted random choice among the behaviours that currently apply."""
+
+    learns_weights = True
+
+    def __init__(self, species, weights):
+        self.species = species
+        self.weights = weights
+        threshold = REPRODUCTION_THRESHOLD if species == "orc" else DWARF_REPRODUCTION_THRESHOLD
+        self.low_energy = threshold * LOW_ENERGY_RATIO
+
+    def weighted_choice(self, actions):
+        """Choose an action based on learned weights."""
+        table = self.weights[self.species]
+        w = [table.get(a, 1.0) for a in actions]
+        total = sum(w)
+        r = random.random() * total
+        upto = 0.0
+        for act, weight in zip(actions, w):
+            upto += weight
+            if r <= upto:
+                return act
+        return actions[-1]
+
+    def decide(self, world, idx):
+        choices = []
+        for i in idx:
+            possible = []
+            if world.energy[i] <= self.low_energy and world.has_res[i]:
+                possible.append("seek_food")
+            if world.enemy_in_sight(i):
+                possible.append("hunt" if world.is_predator[i] else "flee")
+            possible.append("wander")
+            choices.append(self.weighted_choice(possible))
+        return choices
+
+
+class QLearningController(Controller):
+    """Tabular Q-learning shared by every agent of a species.
+
+    The state mirrors the ``Learning`` simulation: signs of the offsets to
+    the nearest resource and enemy within vision plus an energy bucket.  The
+    reward of a decision is the agent's energy change by its next decision.
+    """
+
+    ACTIONS = ("wander", "seek_food", "flee", "stay")
+
+    def __init__(self):
+        self.q_table = defaultdict(lambda: np.zeros(len(self.ACTIONS)))
+        self.pending = {}
+
+    def state(self, world, i):
+        in_sight = world.vision[i]
+        food = np.sign(world.res_delta[i]) if world.res_dist[i] <= in_sight else (0, 0)
+        enemy = world.enemy_dir[i] if world.enemy_in_sight(i) else (0, 0)
+        bucket = min(int(world.energy[i] / (MAX_ENERGY / 5)), 4)
+        return (int(food[0]), int(food[1]), int(enemy[0]), int(enemy[1]), bucket)
+
+    def _learn(self, state, action, reward, next_state):
+        best_next = 0.0 if next_state is None else np.max(self.q_table[next_state])
+        td_error = reward + GAMMA * best_next - self.q_table[state][action]
+        self.q_table[state][action] += ALPHA * td_error
+
+    def decide(self, world, idx):
+        seen = set()
+        choices = []
+        for i in idx:
+            a = world.agents[i]
+            s = self.state(world, i)
+            prev = self.pending.get(id(a))
+            if prev is not None:
+                _, ps, pa, pe = prev
+                self._learn(ps, pa, a.energy - pe, s)
+            if random.random() < EPSILON:
+                action = random.randrange(len(self.ACTIONS))
+            else:
+                action = int(np.argmax(self.q_table[s]))
+            self.pending[id(a)] = (a, s, action, a.energy)
+            seen.add(id(a))
+            choices.append(self.ACTIONS[action])
+        # agents that died since their last decision get a terminal update
+        for key in [k for k in self.pending if k not in seen]:
+            a, ps, pa, pe = self.pending.pop(key)
+            if not a.alive:
+                self._learn(ps, pa, a.energy - pe, None)
+        return choices
+
+
+class PolicyController(Controller):
+    """Runs a policy trained in ``orc_dwarf_rl`` for a whole species.
+
+    Observations use the ``OrcDwarfEnv`` layout and the whole species is
+    inferred with a single ``act_batch`` call.  ``policy`` is an
+    ``RLAgent`` or an exported ``NumpyPolicy``.
+    """
+
+    # OrcDwarfEnv actions -> behaviours (attack closes in on the enemy)
+    ACTIONS = ("north", "south", "east", "west", "stay", "seek_food", "hunt", "flee", "hunt")
+
+    def __init__(self, policy):
+        self.policy = policy
+
+    @classmethod
+    def load(cls, path):
+        if path.endswith(".npz"):
+            from orc_dwarf_rl.numpy_policy import NumpyPolicy
+            return cls(NumpyPolicy.load(path))
+        from orc_dwarf_rl.agent import RLAgent
+        return cls(RLAgent.load(path))
+
+    def observations(self, world, idx):
+        obs = np.empty((len(idx), 9), dtype=np.float32)
+        obs[:, 0:2] = world.pos[idx] / (GRID_SIZE - 1)
+        obs[:, 2] = world.energy[idx] / RL_ENERGY_SCALE
+        obs[:, 3:5] = world.res_delta[idx] / GRID_SIZE
+        obs[:, 5:7] = world.enemy_delta[idx] / GRID_SIZE
+        obs[:, 7] = RL_SIGHT / GRID_SIZE
+        obs[:, 8] = 1.0
+        return obs
+
+    def action_masks(self, world, idx):
+        masks = np.ones((len(idx), 9), dtype=bool)
+        for col, (dx, dy) in enumerate(STEPS.values()):
+            target = (world.pos[idx] + (dx, dy)) % GRID_SIZE
+            masks[:, col] = [tuple(p) not in world.obstacles for p in target.tolist()]
+        masks[:, 5] = (world.res_delta[idx] != 0).any(axis=1)
+        masks[:, 6] = masks[:, 7] = (world.enemy_delta[idx] != 0).any(axis=1)
+        masks[:, 8] = world.has_enemy[idx] & (world.enemy_dist[idx] <= 1)
+        return masks
+
+    def decide(self, world, idx):
+        if len(idx) == 0:
+            return []
+        actions = self.policy.act_batch(self.observations(world, idx), self.action_masks(world, idx))
+        return [self.ACTIONS[int(k)] for k in actions]
+
+
+def make_controller(kind, species, weights):
+    """Build the controller named in config for ``species`` ("orc"/"dwarf")."""
+    if kind == "heuristic":
+        return HeuristicController(species, weights)
+    if kind == "qlearning":
+        return QLearningController()
+    if kind == "policy":
+        if PERCEPTION_MODE == "influence":
+            raise ValueError('Policy controllers need PERCEPTION_MODE = "nearest": '
+                             "influence maps give no enemy offsets for their observations")
+        return PolicyController.load(ORC_POLICY_PATH if species == "orc" else DWARF_POLICY_PATH)
+    raise ValueError(f"Unknown controller: {kind}")
@@ -0,0 +1,543 @@
+# distributed_sim.py
+
+import multiprocessing as mp
+import sys
+import time
+from multiprocessing import shared_memory
+from threading import BrokenBarrierError
+
+import numpy as np
+from config import *
+from agent import mutate_traits
+from batch_sim import SEEK, HUNT, FLEE, WANDER, FALLBACK_MOVES
+from influence import InfluenceMaps
+
+# Columns of the per-tile agent tables
+FIELDS = ("id", "x", "y", "energy", "is_orc", "speed", "vision", "age")
+ID, X, Y, ENERGY, IS_ORC, SPEED, VISION, AGE = range(len(FIELDS))
+# Ghost band: the farthest any rule looks across a tile border
+HALO = max(ORC_MAX_VISION_RADIUS, DWARF_MAX_VISION_RADIUS, PACK_RADIUS)
+AROUND = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+# counters per tile
+BIRTHS, KILLS, ORC_DEATHS, DWARF_DEATHS, DROPPED = range(5)
+# per-tile densities of the 30x30 main.py world
+BASE_AREA = 30 * 30
+
+
+def _layout(tiles, capacity, resources, grid_size):
+    """Offsets of the shared arrays in one block (see ``Tiles``)."""
+    offset = 0
+    layout = []
+    for name, dtype, shape in (
+        ("agents", np.float64, (tiles, capacity, len(FIELDS))),
+        ("count", np.int64, (tiles,)),
+        ("halo", np.float64, (2, tiles, capacity, 3)),
+        ("halo_count", np.int64, (2, tiles)),
+        ("outbox", np.float64, (tiles, capacity, len(FIELDS) + 1)),
+        ("outbox_count", np.int64, (tiles,)),
+        ("resources", np.int64, (tiles, resources, 2)),
+        ("has_resource", np.bool_, (tiles, resources)),
+        ("next_id", np.int64, (tiles,)),
+        ("counters", np.int64, (tiles, 5)),
+        ("obstacles", np.bool_, (grid_size, grid_size)),
+    ):
+        layout.append((name, dtype, shape, offset))
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+        offset += -offset % 8
+    return layout, offset
+
+
+def _buffers(shm, tiles, capacity, resources, grid_size):
+    layout, _ = _layout(tiles, capacity, resources, grid_size)
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        for name, dtype, shape, offset in layout
+    }
+
+
+def _fast_size(n):
+    """Smallest size >= ``n`` with no prime factor above 5."""
+    while True:
+        m = n
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return n
+        n += 1
+
+
+class Tiles:
+    """The torus split into ``tiles_per_side**2`` square tiles, each owning
+    the agents and resource nodes inside it.
+
+    A turn runs in three phases per tile, separated by barriers so every
+    tile can be processed by a different process:
+
+    ``move``
+        Perception, behaviour choice, movement and energy loss.  Enemies
+        are sensed with influence maps over the tile plus a ``HALO`` band
+        of ghosts published by the eight neighbours.  Agents that cross a
+        border go to the tile's outbox.
+    ``settle``
+        Takes in migrants from the neighbours' outboxes, then handles eating
+        and starvation.  It publishes the new border agents for ``interact``.
+    ``interact``
+        Predator/prey contests with pack bonuses counted over tile and halo,
+        reproduction, reinforcements and resource respawns.  It publishes
+        the border agents for the next ``move``.
+
+    Halos are double buffered.  Agent tables are kept sorted by id and
+    every random draw comes from a generator seeded with ``(seed, turn,
+    tile, phase)``, so results do not depend on how tiles are spread over
+    processes.
+    """
+
+    def __init__(self, views, grid_size, tiles_per_side, seed):
+        self.v = views
+        self.grid_size = grid_size
+        self.tiles_per_side = tiles_per_side
+        self.num_tiles = tiles_per_side * tiles_per_side
+        self.size = grid_size // tiles_per_side
+        self.padded = self.size + 2 * HALO
+        self.capacity = views["agents"].shape[1]
+        self.seed = seed
+        # the maps are at least one cell wider than the window so that the
+        # uphill step of a cell just outside the tile never sees ghosts
+        # wrapped around from the far side; 2-3-5 sizes also FFT faster
+        self.maps = InfluenceMaps(HALO, _fast_size(self.padded + 1))
+        self.low_energy = np.array([REPRODUCTION_THRESHOLD, DWARF_REPRODUCTION_THRESHOLD]) * LOW_ENERGY_RATIO
+
+    # -- geometry and turn-wide state ------------------------------------
+    def origin(self, t):
+        tx, ty = divmod(t, self.tiles_per_side)
+        return tx * self.size, ty * self.size
+
+    def neighbours(self, t):
+        n = self.tiles_per_side
+        tx, ty = divmod(t, n)
+        return [((tx + dx) % n) * n + (ty + dy) % n for dx, dy in AROUND]
+
+    def tile_of(self, x, y):
+        return (x // self.size) * self.tiles_per_side + y // self.size
+
+    def local(self, t, x, y):
+        """Coordinates in the tile's padded window (tile at ``HALO..``)."""
+        ox, oy = self.origin(t)
+        g = self.grid_size
+        return (x - ox + HALO) % g, (y - oy + HALO) % g
+
+    def rng(self, turn, t, phase):
+        return np.random.default_rng([self.seed, turn, t, phase])
+
+    @staticmethod
+    def day(turn):
+        # main.py starts at night and flips every DAY_DURATION turns
+        return (turn // DAY_DURATION) % 2 == 1
+
+    def weather(self, turn):
+        start = turn - turn % WEATHER_CHANGE_INTERVAL
+        if start == 0:
+            return "clear"
+        return WEATHER_STATES[np.random.default_rng([self.seed, start]).integers(len(WEATHER_STATES))]
+
+    # -- table access ---------------------------------------------------
+    def table(self, t):
+        return self.v["agents"][t, :self.v["count"][t]].copy()
+
+    def store(self, t, rows):
+        """Replace the table of tile ``t`` and return the rows kept; rows
+        past ``capacity`` are dropped."""
+        self.v["counters"][t, DROPPED] += max(0, len(rows) - self.capacity)
+        rows = rows[:self.capacity]
+        self.v["agents"][t, :len(rows)] = rows
+        self.v["count"][t] = len(rows)
+        return rows
+
+    def publish(self, t, rows, buffer):
+        """Write the agents within ``HALO`` of the tile's borders."""
+        ox, oy = self.origin(t)
+        lx, ly = rows[:, X] - ox, rows[:, Y] - oy
+        edge = ((lx < HALO) | (lx >= self.size - HALO) | (ly < HALO) | (ly >= self.size - HALO))
+        band = rows[edge][:, [X, Y, IS_ORC]]
+        self.v["halo"][buffer, t, :len(band)] = band
+        self.v["halo_count"][buffer, t] = len(band)
+
+    def ghosts(self, t, buffer):
+        """Neighbours' border agents that fall inside the padded window, as
+        local ``(x, y)`` and an is-orc flag."""
+        halo, count = self.v["halo"][buffer], self.v["halo_count"][buffer]
+        rows = np.concatenate([halo[nb, :count[nb]] for nb in self.neighbours(t)])
+        lx, ly = self.local(t, rows[:, 0].astype(np.int64), rows[:, 1].astype(np.int64))
+        inside = (lx < self.padded) & (ly < self.padded)
+        return np.stack([lx[inside], ly[inside]], axis=1), rows[inside, 2] == 1
+
+    def empty_cells(self, t, rows, k, rng):
+        """``k`` distinct random free cells of tile ``t``."""
+        ox, oy = self.origin(t)
+        s, g = self.size, self.grid_size
+        taken = self.v["obstacles"][ox:ox + s, oy:oy + s].copy()
+        res = self.v["resources"][t][self.v["has_resource"][t]]
+        taken[res[:, 0] - ox, res[:, 1] - oy] = True
+        taken[rows[:, X].astype(np.int64) - ox, rows[:, Y].astype(np.int64) - oy] = True
+        free = np.flatnonzero(~taken.ravel())
+        cells = rng.choice(free, min(k, len(free)), replace=False)
+        return ox + cells // s, oy + cells % s
+
+    def new_agents(self, t, x, y, orc, energy, rng, speed=None, vision=None):
+        """Table rows for agents born in tile ``t`` (ids unique over tiles)."""
+        k = len(x)
+        first = self.v["next_id"][t]
+        self.v["next_id"][t] += k
+        rows = np.zeros((k, len(FIELDS)))
+        rows[:, ID] = (first + np.arange(k)) * self.num_tiles + t
+        rows[:, X], rows[:, Y], rows[:, ENERGY], rows[:, IS_ORC] = x, y, energy, orc
+        if speed is None:
+            lo, hi = (ORC_MIN_SPEED, ORC_MAX_SPEED) if orc else (DWARF_MIN_SPEED, DWARF_MAX_SPEED)
+            speed = rng.uniform(lo, hi, k)
+        if vision is None:
+            lo, hi = ((ORC_MIN_VISION_RADIUS, ORC_MAX_VISION_RADIUS) if orc
+                      else (DWARF_MIN_VISION_RADIUS, DWARF_MAX_VISION_RADIUS))
+            vision = rng.integers(lo, hi + 1, k)
+        rows[:, SPEED], rows[:, VISION] = speed, vision
+        return rows
+
+    def populate(self, t, orcs, dwarves):
+        """Resource nodes and starting agents of tile ``t``."""
+        rng = self.rng(0, t, 0)
+        rows = np.zeros((0, len(FIELDS)))
+        self.respawn(t, rows, rng)
+        for orc, count, energy in ((True, orcs, INITIAL_PREDATOR_ENERGY),
+                                   (False, dwarves, INITIAL_PREY_ENERGY)):
+            x, y = self.empty_cells(t, rows, count, rng)
+            rows = np.concatenate([rows, self.new_agents(t, x, y, orc, energy, rng)])
+        self.publish(t, self.store(t, rows), 0)
+
+    def respawn(self, t, rows, rng):
+        missing = np.flatnonzero(~self.v["has_resource"][t])
+        x, y = self.empty_cells(t, rows, len(missing), rng)
+        missing = missing[:len(x)]
+        self.v["resources"][t, missing, 0] = x
+        self.v["resources"][t, missing, 1] = y
+        self.v["has_resource"][t, missing] = True
+
+    # -- phases ---------------------------------------------------------
+    def move(self, t, turn):
+        rng = self.rng(turn, t, 1)
+        self.v["outbox_count"][t] = 0
+        a = self.table(t)
+        a[:, AGE] += 1
+        a = a[a[:, AGE] <= MAX_AGE]
+        if not len(a):
+            self.store(t, a)
+            return
+        g = self.grid_size
+        x, y = a[:, X].astype(np.int64), a[:, Y].astype(np.int64)
+        speed = a[:, SPEED]
+        day = self.day(turn)
+        weather = self.weather(turn)
+        orc = a[:, IS_ORC] == 1
+        predator = orc == day
+
+        # enemies through influence maps over the tile and its halo
+        lx, ly = self.local(t, x, y)
+        ghost_pos, ghost_orc = self.ghosts(t, 0)
+        pos = np.concatenate([np.stack([lx, ly], axis=1), ghost_pos])
+        hunters = np.concatenate([predator, ghost_orc == day])
+        to_prey, step_prey = self.maps.sense(pos[~hunters])
+        to_pred, step_pred = self.maps.sense(pos[hunters])
+        cell = lx * self.maps.grid_size + ly
+        enemy_dist = np.where(predator, to_prey[cell], to_pred[cell])
+        enemy_step = np.where(predator[:, None], step_prey[cell], step_pred[cell])
+
+        res = self.v["resources"][t][self.v["has_resource"][t]]
+        res_delta = np.zeros((len(a), 2), dtype=np.int64)
+        if len(res):
+            delta = res[None, :, :] - np.stack([x, y], axis=1)[:, None, :]
+            nearest = np.abs(delta).sum(axis=2).argmin(axis=1)
+            res_delta = delta[np.arange(len(a)), nearest]
+
+        # HeuristicController with default weights
+        species = (~orc).astype(np.int64)
+        in_sight = enemy_dist <= a[:, VISION]
+        options = np.stack([(a[:, ENERGY] <= self.low_energy[species]) & (len(res) > 0),
+                            in_sight & predator, in_sight & ~predator,
+                            np.ones(len(a), dtype=bool)], axis=1)
+        cumulative = options.cumsum(axis=1)
+        r = rng.random(len(a)) * cumulative[:, -1]
+        choice = (cumulative < r[:, None]).sum(axis=1).clip(max=WANDER)
+
+        tries = rng.integers(-1, 2, size=(5, len(a), 2))
+        step = tries[4]
+        for k in range(3, -1, -1):
+            tx = np.trunc(x + tries[k, :, 0] * speed).astype(np.int64) % g
+            ty = np.trunc(y + tries[k, :, 1] * speed).astype(np.int64) % g
+            step = np.where(~self.v["obstacles"][tx, ty][:, None], tries[k], step)
+        slowed = (weather == "storm") & (rng.random(len(a)) < STORM_MOVEMENT_SLOWDOWN)
+        step = np.where((choice == SEEK)[:, None], np.sign(res_delta), step)
+        step = np.where(((choice == HUNT) & ~slowed)[:, None], enemy_step, step)
+        step = np.where((choice == FLEE)[:, None], -enemy_step, step)
+
+        nx = np.trunc(x + step[:, 0] * speed).astype(np.int64) % g
+        ny = np.trunc(y + step[:, 1] * speed).astype(np.int64) % g
+        blocked = np.flatnonzero(self.v["obstacles"][nx, ny])
+        if len(blocked):
+            fx = (x[blocked, None] + FALLBACK_MOVES[:, 0]) % g
+            fy = (y[blocked, None] + FALLBACK_MOVES[:, 1]) % g
+            scores = rng.random(fx.shape)
+            scores[self.v["obstacles"][fx, fy]] = -1.0
+            pick = scores.argmax(axis=1)
+            rows = np.arange(len(blocked))
+            nx[blocked], ny[blocked] = fx[rows, pick], fy[rows, pick]
+        a[:, X], a[:, Y] = nx, ny
+
+        extra = {"rain": RAIN_ENERGY_LOSS_INCREASE, "storm": STORM_ENERGY_LOSS_INCREASE}.get(weather, 0.0)
+        mult = DAY_TEMP_MULTIPLIER if day else NIGHT_TEMP_MULTIPLIER
+        a[:, ENERGY] -= (np.where(predator, PREDATOR_ENERGY_LOSS, PREY_ENERGY_LOSS) + extra) * mult
+
+        dest = self.tile_of(nx, ny)
+        leaving = dest != t
+        out = np.concatenate([a[leaving], dest[leaving, None]], axis=1)
+        self.v["outbox"][t, :len(out)] = out
+        self.v["outbox_count"][t] = len(out)
+        self.store(t, a[~leaving])
+
+    def settle(self, t, turn):
+        outbox, count = self.v["outbox"], self.v["outbox_count"]
+        incoming = [outbox[nb, :count[nb]] for nb in self.neighbours(t)]
+        incoming = np.concatenate(incoming)
+        a = np.concatenate([self.table(t), incoming[incoming[:, -1] == t, :-1]])
+        a = a[np.argsort(a[:, ID], kind="stable")]
+
+        # each node goes to the lowest id standing on it
+        g = self.grid_size
+        cells = a[:, X].astype(np.int64) * g + a[:, Y].astype(np.int64)
+        has = np.flatnonzero(self.v["has_resource"][t])
+        if len(has) and len(a):
+            res = self.v["resources"][t, has]
+            order = np.argsort(cells, kind="stable")
+            sorted_cells = cells[order]
+            at = np.searchsorted(sorted_cells, res[:, 0] * g + res[:, 1])
+            hit = (at < len(a)) & (sorted_cells[np.minimum(at, len(a) - 1)] == res[:, 0] * g + res[:, 1])
+            eater = order[at[hit]]
+            a[eater, ENERGY] += np.where(a[eater, IS_ORC] == 1, 1.0, 1.5) * RESOURCE_NODE_ENERGY
+            self.v["has_resource"][t, has[hit]] = False
+
+        starved = a[:, ENERGY] <= 0
+        self.v["counters"][t, ORC_DEATHS] += int((starved & (a[:, IS_ORC] == 1)).sum())
+        self.v["counters"][t, DWARF_DEATHS] += int((starved & (a[:, IS_ORC] == 0)).sum())
+        self.publish(t, self.store(t, a[~starved]), 1)
+
+    def interact(self, t, turn):
+        rng = self.rng(turn, t, 3)
+        a = self.table(t)
+        g = self.grid_size
+        day = self.day(turn)
+        orc = a[:, IS_ORC] == 1
+        predator = orc == day
+        x, y = a[:, X].astype(np.int64), a[:, Y].astype(np.int64)
+        cells = x * g + y
+        dead = np.zeros(len(a), dtype=bool)
+
+        preds = np.flatnonzero(predator)
+        prey = np.flatnonzero(~predator)
+        if len(preds) and len(prey):
+            # every predator takes on the lowest prey on its cell; a prey picked
+            # by several predators only fights the lowest one
+            order = prey[np.argsort(cells[prey], kind="stable")]
+            at = np.searchsorted(cells[order], cells[preds])
+            at = np.minimum(at, len(order) - 1)
+            found = cells[order[at]] == cells[preds]
+            hunters, targets = preds[found], order[at[found]]
+            targets, first = np.unique(targets, return_index=True)
+            hunters = hunters[first]
+            if len(hunters):
+                lx, ly = self.local(t, x, y)
+                ghost_pos, ghost_orc = self.ghosts(t, 1)
+                pos = np.concatenate([np.stack([lx, ly], axis=1)[predator], ghost_pos[(ghost_orc == day)]])
+                near = np.rint(self.maps.counts(pos)[PACK_RADIUS]).astype(np.int64)
+                pack = near[lx[hunters], ly[hunters]] - 1
+                e_pred, e_prey = a[hunters, ENERGY], a[targets, ENERGY]
+                win = rng.random(len(hunters)) < e_pred / (e_pred + e_prey + 1e-6)
+                a[hunters[win], ENERGY] += PREDATOR_ENERGY_GAIN * (1 + PACK_ENERGY_BONUS_MULTIPLIER * pack[win])
+                dead[targets[win]] = True
+                dead[hunters[~win]] = True
+                self.v["counters"][t, KILLS] += int(win.sum())
+        self.v["counters"][t, ORC_DEATHS] += int((dead & orc).sum())
+        self.v["counters"][t, DWARF_DEATHS] += int((dead & ~orc).sum())
+        a = a[~dead]
+
+        born = []
+        for species in (True, False):
+            threshold = REPRODUCTION_THRESHOLD if species else DWARF_REPRODUCTION_THRESHOLD
+            parents = np.flatnonzero((a[:, IS_ORC] == species) & (a[:, ENERGY] >= threshold))
+            if not len(parents):
+                continue
+            energy = a[parents, ENERGY]
+            if species:
+                child = np.floor(energy / 2)
+                a[parents, ENERGY] = child
+                speed = mutate_traits(a[parents, SPEED], ORC_MIN_SPEED, ORC_MAX_SPEED, rng)
+                vision = mutate_traits(a[parents, VISION], ORC_MIN_VISION_RADIUS, ORC_MAX_VISION_RADIUS, rng)
+            else:
+                child = np.trunc(energy * (1 - DWARF_REPRODUCTION_COST))
+                a[parents, ENERGY] = np.trunc(energy * DWARF_REPRODUCTION_COST)
+                speed = mutate_traits(a[parents, SPEED], DWARF_MIN_SPEED, DWARF_MAX_SPEED, rng)
+                vision = mutate_traits(a[parents, VISION], DWARF_MIN_VISION_RADIUS, DWARF_MAX_VISION_RADIUS, rng)
+            born.append(self.new_agents(t, a[parents, X], a[parents, Y], species, child, rng,
+                                        speed, vision))
+            self.v["counters"][t, BIRTHS] += len(parents)
+
+        interval = REINFORCEMENT_INTERVAL * (1 + turn // 500)
+        if turn % interval == 0:
+            a[:, ENERGY] += REINFORCEMENT_ENERGY_BOOST
+            for species, count, energy in ((True, REINFORCEMENT_NEW_ORCS, INITIAL_PREDATOR_ENERGY),
+                                           (False, REINFORCEMENT_NEW_DWARVES, INITIAL_PREY_ENERGY)):
+                sx, sy = self.empty_cells(t, np.concatenate([a] + born), count, rng)
+                born.append(self.new_agents(t, sx, sy, species, energy, rng))
+        a = self.store(t, np.concatenate([a] + born))
+        if turn % RESOURCE_NODE_RESPAWN_INTERVAL == 0:
+            self.respawn(t, a, rng)
+        self.publish(t, a, 0)
+
+
+def _worker(shm_name, shape, seed, rank, workers, first_turn, turns, barrier):
+    tiles_per_side, capacity, resources, grid_size = shape
+    shm = shared_memory.SharedMemory(name=shm_name)
+    views = _buffers(shm, tiles_per_side ** 2, capacity, resources, grid_size)
+    tiles = Tiles(views, grid_size, tiles_per_side, seed)
+    mine = range(rank, tiles.num_tiles, workers)
+    try:
+        for turn in range(first_turn + 1, first_turn + turns + 1):
+            for phase in (tiles.move, tiles.settle, tiles.interact):
+                for t in mine:
+                    phase(t, turn)
+                barrier.wait()
+    except BrokenBarrierError:
+        pass
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        del views, tiles
+        shm.close()
+
+
+class DistributedSimulation:
+    """The main.py rules on a large torus, split into tiles over processes.
+
+    The ``grid_size`` map is cut into ``tiles_per_side**2`` tiles, and
+    ``workers`` processes each step a fixed share of them.  All state lives
+    in one shared-memory block (see ``Tiles``), so processes only meet at
+    barriers.  Obstacles, resource nodes and starting agents keep the
+    densities of the 30x30 main.py world.  ``workers=0`` steps every tile in
+    this process; any worker count gives the same run for the same seed.
+    """
+
+    def __init__(self, grid_size=GRID_SIZE, tiles_per_side=TILES_PER_SIDE, workers=SIM_WORKERS,
+                 seed=0, capacity=TILE_CAPACITY):
+        if grid_size % tiles_per_side or grid_size // tiles_per_side < HALO or tiles_per_side < 3:
+            raise ValueError(f"need at least 3 tiles per side of at least {HALO} cells "
+                             f"dividing grid_size {grid_size}")
+        self.grid_size = grid_size
+        self.tiles_per_side = tiles_per_side
+        self.workers = workers
+        self.seed = seed
+        self.turn = 0
+        size = grid_size // tiles_per_side
+        scale = size * size / BASE_AREA
+        resources = max(1, round(RESOURCE_NODE_COUNT * scale))
+        self.shape = (tiles_per_side, capacity, resources, grid_size)
+        _, nbytes = _layout(tiles_per_side ** 2, capacity, resources, grid_size)
+        self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self.views = _buffers(self.shm, tiles_per_side ** 2, capacity, resources, grid_size)
+        for view in self.views.values():
+            view[...] = 0
+        self.tiles = Tiles(self.views, grid_size, tiles_per_side, seed)
+
+        rng = np.random.default_rng([seed])
+        count = round(OBSTACLE_COUNT * grid_size * grid_size / BASE_AREA)
+        cells = rng.choice(grid_size * grid_size, count, replace=False)
+        self.views["obstacles"][cells // grid_size, cells % grid_size] = True
+        for t in range(self.tiles.num_tiles):
+            self.tiles.populate(t, max(1, round(NUM_ORCS * scale)), max(1, round(NUM_DWARVES * scale)))
+
+    def run(self, turns):
+        """Advance every tile by ``turns`` turns and return ``summary()``."""
+        if self.workers <= 0:
+            for turn in range(self.turn + 1, self.turn + turns + 1):
+                for phase in (self.tiles.move, self.tiles.settle, self.tiles.interact):
+                    for t in range(self.tiles.num_tiles):
+                        phase(t, turn)
+        else:
+            method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+            ctx = mp.get_context(method)
+            barrier = ctx.Barrier(self.workers)
+            procs = [ctx.Process(target=_worker, daemon=True,
+                                 args=(self.shm.name, self.shape, self.seed, rank, self.workers,
+                                       self.turn, turns, barrier))
+                     for rank in range(self.workers)]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join()
+            if any(p.exitcode for p in procs):
+                raise RuntimeError("a tile worker failed")
+        self.turn += turns
+        return self.summary()
+
+    def agents(self):
+        """Every agent as one table sorted by id (columns ``FIELDS``)."""
+        rows = np.concatenate([self.tiles.table(t) for t in range(self.tiles.num_tiles)])
+        return rows[np.argsort(rows[:, ID])]
+
+    def summary(self):
+        rows = self.agents()
+        counters = self.views["counters"].sum(axis=0)
+        return {
+            "turn": self.turn,
+            "orcs": int((rows[:, IS_ORC] == 1).sum()),
+            "dwarves": int((rows[:, IS_ORC] == 0).sum()),
+            "births": int(counters[BIRTHS]),
+            "kills": int(counters[KILLS]),
+            "orc_deaths": int(counters[ORC_DEATHS]),
+            "dwarf_deaths": int(counters[DWARF_DEATHS]),
+            "dropped": int(counters[DROPPED]),
+        }
+
+    def close(self):
+        del self.views, self.tiles
+        self.shm.close()
+        self.shm.unlink()
+
+
+def check(grid_size=90, tiles_per_side=3, capacity=24, turns=60, seed=5):
+    """Regression run: tiles small enough to overflow must drop agents
+    without failing and give the same result for any number of workers."""
+    results = []
+    for workers in (0, 1, 3):
+        sim = DistributedSimulation(grid_size, tiles_per_side, workers, seed, capacity)
+        summary = sim.run(turns)
+        results.append(sim.agents())
+        sim.close()
+        print(f"{workers} workers: {summary}")
+    assert summary["dropped"] > 0, "no tile went over capacity"
+    assert all(np.array_equal(results[0], r) for r in results[1:]), "results depend on workers"
+    print("ok")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--check"]:
+        check()
+        sys.exit()
+    args = [int(v) for v in sys.argv[1:]]
+    grid, tiles, workers, turns = args + [300, 10, 4, 200][len(args):]
+    sim = DistributedSimulation(grid, tiles, workers)
+    print(sim.summary())
+    start = time.perf_counter()
+    summary = sim.run(turns)
+    elapsed = time.perf_counter() - start
+    print(summary)
+    print(f"{grid}x{grid} map, {tiles * tiles} tiles on {workers} workers: "
+          f"{turns / elapsed:.1f} turns/s")
+    sim.close()
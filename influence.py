@@ -0,0 +1,52 @@
+# influence.py
+
+import numpy as np
+from config import *
+from navigation import MOVES, neighbour_table
+
+
+class InfluenceMaps:
+    """Enemy perception from blurred densities instead of pairwise searches.
+
+    ``sense`` spreads a group of agents over the grid and convolves the
+    density (by FFT, so it wraps around the torus) with one diamond kernel
+    per Manhattan radius ``0..radius``.  Cell values then count the group's
+    members within each radius, which gives the distance to the closest one
+    up to ``radius``.  A weighted sum of them is an influence that doubles
+    with every step toward a member, and its uphill neighbour is stored as
+    the direction to move from every cell.  The cost depends on the grid
+    size only; agents read the results by cell index (``x * grid_size + y``).
+    """
+
+    def __init__(self, radius=INFLUENCE_RADIUS, grid_size=GRID_SIZE):
+        self.radius = radius
+        self.grid_size = grid_size
+        d = np.arange(grid_size)
+        d = np.minimum(d, grid_size - d)
+        dist = d[:, None] + d[None, :]
+        kernels = dist[None] <= np.arange(radius + 1)[:, None, None]
+        self.kernels = np.fft.rfft2(kernels.astype(np.float64))
+        # each step closer doubles an agent's pull, so the nearest dominates
+        self.weights = 2.0 ** np.arange(radius, -1, -1)
+        self.neighbours = neighbour_table(grid_size)
+
+    def counts(self, pos):
+        """``(radius + 1, g, g)`` number of agents at ``pos`` within each
+        Manhattan radius of every cell."""
+        g = self.grid_size
+        density = np.zeros((g, g))
+        np.add.at(density, (pos[:, 0], pos[:, 1]), 1)
+        return np.fft.irfft2(np.fft.rfft2(density)[None] * self.kernels, s=(g, g))
+
+    def sense(self, pos):
+        """Distance to the nearest of the agents at ``pos`` (``inf`` beyond
+        ``radius``) and the step toward them, for every cell."""
+        counts = self.counts(pos)
+        seen = (counts > 0.5).reshape(self.radius + 1, -1)
+        nearest = np.where(seen.any(axis=0), seen.argmax(axis=0), np.inf)
+        pull = np.tensordot(self.weights, counts, axes=1).ravel()
+        around = pull[self.neighbours]
+        best = around.argmax(axis=1)
+        uphill = around[np.arange(len(best)), best] > pull + 0.5
+        step = np.where(uphill[:, None], MOVES[best], 0)
+        return nearest, step
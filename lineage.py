@@ -0,0 +1,145 @@
+# lineage.py
+
+import numpy as np
+from config import *
+
+# columns stored per birth, 25 bytes in total
+COLUMNS = (
+    ("parent", np.int32),      # -1 for founders (initial and reinforcement agents)
+    ("founder", np.int32),     # root of the agent's clade
+    ("generation", np.int32),  # 0 for founders
+    ("turn", np.int32),
+    ("is_orc", np.bool_),
+    ("speed", np.float32),
+    ("vision", np.float32),
+)
+TRAITS = {"speed": (MIN_SPEED, MAX_SPEED), "vision": (MIN_VISION_RADIUS, MAX_VISION_RADIUS)}
+
+
+class Lineage:
+    """Append-only record of every agent and the parent it was born from.
+
+    Agents get consecutive ids in the order they are added, so an id is the
+    row of the agent's parent, founder, generation, birth turn, species and
+    traits in the column arrays, which double in size when full.  Parents
+    are always added before their children.  Per-generation trait
+    histograms (``[generation, is_orc, bin]``, over the global trait ranges)
+    are updated as births come in, so trait evolution is available without
+    rescanning the record.
+    """
+
+    def __init__(self, bins=LINEAGE_HISTOGRAM_BINS, capacity=1024):
+        self.count = 0
+        self.columns = {name: np.zeros(capacity, dtype) for name, dtype in COLUMNS}
+        self.edges = {name: np.linspace(lo, hi, bins + 1) for name, (lo, hi) in TRAITS.items()}
+        self.histograms = {name: np.zeros((1, 2, bins), np.int64) for name in TRAITS}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, name):
+        return self.columns[name][:self.count]
+
+    @property
+    def nbytes(self):
+        return sum(c.nbytes for c in self.columns.values()) + sum(
+            h.nbytes for h in self.histograms.values())
+
+    def add(self, parents, turn, is_orc, speed, vision):
+        """Record agents born at ``turn`` from ``parents`` (ids, -1 for
+        founders) and return their new ids.  Arguments may be scalars or
+        equal-length sequences."""
+        parents, is_orc, speed, vision = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(parents, np.int64)), np.atleast_1d(np.asarray(is_orc, bool)),
+            np.atleast_1d(np.asarray(speed, np.float32)), np.atleast_1d(np.asarray(vision, np.float32)))
+        if np.any(parents >= self.count):
+            raise ValueError("parents must be recorded before their children")
+        n = len(parents)
+        self._reserve(self.count + n)
+        ids = np.arange(self.count, self.count + n)
+        known = parents >= 0
+        c = self.columns
+        new = slice(self.count, self.count + n)
+        c["parent"][new] = parents
+        c["founder"][new] = np.where(known, c["founder"][np.where(known, parents, 0)], ids)
+        c["generation"][new] = np.where(known, c["generation"][np.where(known, parents, 0)] + 1, 0)
+        c["turn"][new] = turn
+        c["is_orc"][new] = is_orc
+        c["speed"][new] = speed
+        c["vision"][new] = vision
+        self.count += n
+        self._count_traits(c["generation"][new], is_orc, {"speed": speed, "vision": vision})
+        return ids
+
+    def _reserve(self, n):
+        size = len(self.columns["parent"])
+        if n <= size:
+            return
+        while size < n:
+            size *= 2
+        for name, col in self.columns.items():
+            grown = np.zeros(size, col.dtype)
+            grown[:self.count] = col[:self.count]
+            self.columns[name] = grown
+
+    def _count_traits(self, generation, is_orc, values):
+        top = int(generation.max(initial=0)) + 1
+        for name, hist in self.histograms.items():
+            if top > len(hist):
+                grown = np.zeros((max(top, 2 * len(hist)),) + hist.shape[1:], hist.dtype)
+                grown[:len(hist)] = hist
+                hist = self.histograms[name] = grown
+            bins = hist.shape[2]
+            b = np.searchsorted(self.edges[name], values[name], side="right") - 1
+            np.add.at(hist, (generation, is_orc.astype(np.intp), np.clip(b, 0, bins - 1)), 1)
+
+    @property
+    def generations(self):
+        """Number of generations recorded so far."""
+        return int(self["generation"].max(initial=-1)) + 1
+
+    def histogram(self, trait, orcs=True):
+        """``(generations, bins)`` counts of births per bin of ``trait``
+        ("speed" or "vision"); the bin edges are in ``edges[trait]``."""
+        return self.histograms[trait][:self.generations, int(orcs)]
+
+    def ancestors(self, agent_id):
+        """Ids from ``agent_id``'s parent back to its founder."""
+        parent = self["parent"]
+        chain = []
+        i = int(parent[agent_id])
+        while i >= 0:
+            chain.append(i)
+            i = int(parent[i])
+        return chain
+
+    def descendants(self, agent_id):
+        """Ids of every agent descended from ``agent_id``."""
+        parent = self["parent"]
+        inside = np.zeros(self.count, bool)
+        inside[agent_id] = True
+        # only later members of the same clade can descend from it
+        rows = np.flatnonzero(self["founder"] == self["founder"][agent_id])
+        rows = rows[rows > agent_id]
+        # each pass reaches one generation further down
+        while True:
+            reached = inside[parent[rows]]
+            if np.array_equal(reached, inside[rows]):
+                break
+            inside[rows] = reached
+        return rows[inside[rows]]
+
+    def clades(self, living):
+        """``{founder id: number of agents}`` for the agent ids in
+        ``living``, largest clade first."""
+        founders, counts = np.unique(self["founder"][np.asarray(living, np.int64)], return_counts=True)
+        order = np.argsort(-counts, kind="stable")
+        return dict(zip(founders[order].tolist(), counts[order].tolist()))
+
+    def save(self, path):
+        """Write the record and histograms to an ``.npz`` file."""
+        arrays = {name: self[name] for name, _ in COLUMNS}
+        for name in TRAITS:
+            arrays[f"{name}_histogram"] = self.histograms[name][:self.generations]
+            arrays[f"{name}_edges"] = self.edges[name]
+        np.savez_compressed(path, **arrays)
@@ -3,14 +3,24 @@
 import os
 import json
 import random
+import threading
+import time
+import numpy as np
 import pygame
-from pygame import mixer
+from pygame import mixer, surfarray
 from config import *
-from agent import Orc, Dwarf, mutate_trait
+from agent import Orc, Dwarf, mutate_traits
+from controllers import WorldView, STEPS, make_controller
+from influence import InfluenceMaps
+from lineage import Lineage
+from navigation import DistanceField
+from particles import ParticlePool
+from replay import ReplayRecorder
 
 pygame.init()
 screen = pygame.display.set_mode(WINDOW_SIZE)
 clock = pygame.time.Clock()
+rng = np.random.default_rng()
 
 # Load images
 orc_img = pygame.image.load("assets/orc.png")
@@ -44,6 +54,11 @@ try:
 except Exception:
     weights = default_weights.copy()
 
+controllers = {
+    "orc": make_controller(ORC_CONTROLLER, "orc", weights),
+    "dwarf": make_controller(DWARF_CONTROLLER, "dwarf", weights),
+}
+
 
 def save_high_score(score):
     """Persist high score to file."""
@@ -71,6 +86,12 @@ while len(resource_nodes) < RESOURCE_NODE_COUNT:
     if p not in obstacles and p not in resource_nodes:
         resource_nodes.append(p)
 
+# Steps to the nearest resource node from every cell, kept in sync with
+# resource_nodes lazily by update_agents
+food_field = DistanceField(obstacles) if FLOW_FIELD_NAVIGATION else None
+# Enemy perception by influence maps when PERCEPTION_MODE is "influence"
+influence_maps = InfluenceMaps() if PERCEPTION_MODE == "influence" else None
+
 def random_empty_cell(extra_occupied=None):
     """Return a random cell not occupied by terrain or agents."""
     if extra_occupied is None:
@@ -99,31 +120,71 @@ for _ in range(NUM_DWARVES):
     dwarves.append(d)
     agents.append(d)
 
-heatmap   = [[0]*GRID_SIZE for _ in range(GRID_SIZE)]
+# Occupancy heat indexed [x, y]: decays every tick, +1 per agent on a cell
+heatmap = np.zeros((GRID_SIZE, GRID_SIZE))
+heat_colors = np.stack([np.arange(256), np.zeros(256), np.zeros(256)], axis=1).astype(np.uint8)
+heat_cells = pygame.Surface((GRID_SIZE, GRID_SIZE), pygame.SRCALPHA)
+heat_layer = pygame.Surface((GRID_SIZE * CELL_SIZE, GRID_SIZE * CELL_SIZE), pygame.SRCALPHA)
+heat_source = None  # snapshot heatmap heat_layer was last built from
 last_resource_spawn = 0
 
-# Event log
+# Cached background per sky (terrain never changes) and the composed frame
+# background with resources, rebuilt only when the sky or resources change
+BACKGROUND_COLORS = {"day": DAY_BG_COLOR, "night": NIGHT_BG_COLOR, "storm": (20,20,60)}
+terrain_layers = {}
+background = None
+background_key = None
+minimap_base = None
+# screen areas drawn this frame and in the previous one
+dirty_rects = []
+last_rects = []
+# full-screen overlays (rain, heatmap, game over) drawn in the previous frame
+last_overlays = None
+
+# The simulation thread publishes a snapshot after every turn and queues the
+# events, kills and population counts of each turn; the renderer takes them
+# under sim_lock and draws without holding it.
+frame_state = None
+new_events, new_kills, new_history = [], [], []
+# Renderer side: the snapshot being drawn, eased agent positions (pixels,
+# indexed like main.py's append-only ``agents``) and their trails, the log
+# overlay and the history chart
+view = None
+anim = np.zeros((0, 2))
+trails = np.zeros((0, TRAIL_LENGTH, 2))
+trail_len = np.zeros(0, dtype=int)
 event_log = []
+turn_history, orc_history, dwarf_history = [], [], []
+
+recorder = ReplayRecorder(REPLAY_FILE, obstacles) if RECORD_REPLAY else None
+lineage = Lineage() if RECORD_LINEAGE else None
+
+# Event log
 log_filename = "log.txt"
 if os.path.exists(log_filename):
     os.remove(log_filename)
 def log_event(msg):
     """Append a message to the log overlay and file."""
+    log_events([msg])
+
+def log_events(msgs):
+    """Append several messages with a single write to the log file."""
     with open(log_filename, "a") as f:
-        f.write(msg + "\n")
-    event_log.append(msg)
-    if len(event_log) > LOG_OVERLAY_MAX:
-        event_log.pop(0)
+        f.writelines(msg + "\n" for msg in msgs)
+    new_events.extend(msgs)
+    if recorder:
+        for msg in msgs:
+            recorder.event(msg)
 
 # Death counters
 orc_deaths   = 0
 dwarf_deaths = 0
 
-turn_history, orc_history, dwarf_history = [], [], []
 day = True
 turn_counter = 0
 paused = False
 fast_mode = False  # when True simulation runs at FAST_FPS
+turbo = False  # when True simulation runs as fast as it can
 show_heatmap = SHOW_HEATMAP
 weather_state = "clear"
 last_weather_change = 0
@@ -156,32 +217,6 @@ def count_pack_members(agent):
         if other.alive and other.is_predator and other != agent and agent.distance_to(other) <= PACK_RADIUS
     )
 
-def find_closest_enemy(agent, lst, enemy_flag):
-    """Return nearest opposing agent from a list."""
-    cands = [a for a in lst if a.alive and a.is_predator == enemy_flag]
-    return min(cands, key=lambda e: agent.distance_to(e)) if cands else None
-
-def find_closest_resource(agent):
-    """Return nearest resource node coordinates."""
-    if not resource_nodes:
-        return None
-    return min(resource_nodes, key=lambda p: abs(agent.x - p[0]) + abs(agent.y - p[1]))
-
-
-def weighted_choice(species, actions):
-    """Choose an action based on learned weights."""
-    table = weights[species]
-    w = [table.get(a, 1.0) for a in actions]
-    total = sum(w)
-    r = random.random() * total
-    upto = 0.0
-    for act, weight in zip(actions, w):
-        upto += weight
-        if r <= upto:
-            return act
-    return actions[-1]
-
-
 def update_learning(winner):
     """Update weights based on winner and save to disk."""
     if winner not in ("Orcs", "Dwarves"):
@@ -202,29 +237,54 @@ def update_learning(winner):
     except Exception:
         pass
 
+def record_lineage(new_agents, parents=None):
+    """Register ``new_agents`` in the lineage record, as children of
+    ``parents`` or as founders when there are none."""
+    if lineage is None or not new_agents:
+        return
+    ids = lineage.add(
+        [p.lineage_id for p in parents] if parents else -1,
+        turn_counter,
+        [isinstance(a, Orc) for a in new_agents],
+        [a.speed for a in new_agents],
+        [a.vision_radius for a in new_agents],
+    )
+    for a, i in zip(new_agents, ids.tolist()):
+        a.lineage_id = i
+
 def reinforcement_event():
     """Give energy boost and spawn new agents."""
     global orcs, dwarves
     for a in agents:
         if a.alive:
             a.energy += REINFORCEMENT_ENERGY_BOOST
+    first = len(agents)
     for _ in range(REINFORCEMENT_NEW_ORCS):
         x, y = random_empty_cell()
         agents.append(Orc(x, y, INITIAL_PREDATOR_ENERGY))
     for _ in range(REINFORCEMENT_NEW_DWARVES):
         x, y = random_empty_cell()
         agents.append(Dwarf(x, y, INITIAL_PREY_ENERGY))
+    record_lineage(agents[first:])
     log_event(f"Turn {turn_counter}: Reinforcement")
     orcs    = [x for x in agents if isinstance(x, Orc)]
     dwarves = [x for x in agents if isinstance(x, Dwarf)]
 
+def decide_actions(world):
+    """Ask each species' controller for its agents' behaviours in one batch."""
+    choices = [None] * len(world.agents)
+    for species, controller in controllers.items():
+        idx = world.species(orcs=species == "orc")
+        for i, choice in zip(idx, controller.decide(world, idx)):
+            choices[i] = choice
+    return choices
+
 def update_agents():
     """Move agents and handle energy/aging."""
     global heatmap, orc_deaths, dwarf_deaths
-    heatmap = [[0]*GRID_SIZE for _ in range(GRID_SIZE)]
-    for a in agents:
-        if not a.alive:
-            continue
+    world = WorldView(agents, resource_nodes, obstacles, influence_maps)
+    choices = decide_actions(world)
+    for i, a in enumerate(world.agents):
         old_x, old_y = a.x, a.y
 
         a.update_age_energy_trail()
@@ -235,50 +295,42 @@ def update_agents():
             extra_loss = STORM_ENERGY_LOSS_INCREASE
         loss_mult = DAY_TEMP_MULTIPLIER if day else NIGHT_TEMP_MULTIPLIER
 
-        low_th = (
-            REPRODUCTION_THRESHOLD if isinstance(a, Orc) else DWARF_REPRODUCTION_THRESHOLD
-        ) * LOW_ENERGY_RATIO
-        possible = []
-        res = None
-        tgt = None
-        thr = None
-        if a.energy <= low_th:
-            res = find_closest_resource(a)
-            if res:
-                possible.append("seek_food")
-        if a.is_predator:
-            tgt = find_closest_enemy(a, agents, False)
-            if tgt and a.distance_to(tgt) <= a.vision_radius:
-                possible.append("hunt")
-        else:
-            thr = find_closest_enemy(a, agents, True)
-            if thr and a.distance_to(thr) <= a.vision_radius:
-                possible.append("flee")
-        possible.append("wander")
-        choice = weighted_choice("orc" if isinstance(a, Orc) else "dwarf", possible)
+        choice = choices[i]
+        res = world.resource(i)
         if choice == "seek_food" and res:
-            a.move_toward_pos(*res, obstacles)
+            step = None
+            if food_field:
+                food_field.update(resource_nodes)
+                step = food_field.step(a.x, a.y)
+            if step:
+                a._move(step[0] * a.speed, step[1] * a.speed, obstacles)
+            else:
+                a.move_toward_pos(*res, obstacles)
             log_event(
                 f"Turn {turn_counter}: {'Orc' if isinstance(a, Orc) else 'Dwarf'} low energy seeking food"
             )
-        elif choice == "hunt" and tgt:
+        elif choice == "hunt" and world.has_enemy[i]:
             if not (
                 weather_state == "storm" and random.random() < STORM_MOVEMENT_SLOWDOWN
             ):
-                a.move_toward(tgt, obstacles)
+                dx, dy = world.enemy_step(i)
+                a._move(dx * a.speed, dy * a.speed, obstacles)
             else:
                 a.move_random(obstacles)
-        elif choice == "flee" and thr:
-            a.move_away_from(thr, obstacles)
-        else:
+        elif choice == "flee" and world.has_enemy[i]:
+            dx, dy = world.enemy_step(i)
+            a._move(-dx * a.speed, -dy * a.speed, obstacles)
+        elif choice in STEPS:
+            dx, dy = STEPS[choice]
+            a._move(dx * a.speed, dy * a.speed, obstacles)
+        elif choice != "stay":
             a.move_random(obstacles)
-        a.action_history.append(choice)
+        if controllers["orc" if isinstance(a, Orc) else "dwarf"].learns_weights:
+            a.action_history.append(choice)
 
         loss_base = PREDATOR_ENERGY_LOSS if a.is_predator else PREY_ENERGY_LOSS
         a.energy -= (loss_base + extra_loss) * loss_mult
 
-        heatmap[a.x][a.y] += 1
-
         if (a.x, a.y) in resource_nodes:
             gain = RESOURCE_NODE_ENERGY * (1.5 if isinstance(a, Dwarf) else 1.0)
             a.energy += gain
@@ -295,36 +347,22 @@ def update_agents():
                 death_sound.play()
             log_event(f"Turn {turn_counter}: {'Orc' if isinstance(a,Orc) else 'Dwarf'} died @({a.x},{a.y})")
 
-        a.update_animation()
+    heatmap *= HEATMAP_DECAY
+    cells = np.array([(a.x, a.y) for a in world.agents], dtype=np.intp).reshape(-1, 2)
+    np.add.at(heatmap, (cells[:, 0], cells[:, 1]), 1)
 
-kill_particles = []
+kill_particles = ParticlePool()
 def spawn_kill_particles(cx, cy):
-    """Create particle effects at a location."""
-    for _ in range(KILL_PARTICLE_COUNT):
-        kill_particles.append({
-            "x": cx*CELL_SIZE + CELL_SIZE//2,
-            "y": cy*CELL_SIZE + CELL_SIZE//2,
-            "dx": random.uniform(-1,1)*CELL_SIZE/10,
-            "dy": random.uniform(-1,1)*CELL_SIZE/10,
-            "life": KILL_PARTICLE_LIFETIME
-        })
+    """Queue particle effects at a cell for the renderer."""
+    new_kills.append((cx, cy))
 
 def update_kill_particles(dt):
     """Advance particle animations."""
-    for p in kill_particles[:]:
-        p["x"] += p["dx"]
-        p["y"] += p["dy"]
-        p["life"] -= dt
-        if p["life"] <= 0:
-            kill_particles.remove(p)
+    kill_particles.update(dt)
 
 def draw_kill_particles():
     """Render active kill particles."""
-    for p in kill_particles:
-        alpha = int(255 * (p["life"]/KILL_PARTICLE_LIFETIME))
-        surf = pygame.Surface((4,4), pygame.SRCALPHA)
-        surf.fill((255,255,0,alpha))
-        screen.blit(surf, (p["x"], p["y"]))
+    dirty_rects.extend(kill_particles.draw(screen))
 
 def check_interactions():
     """Resolve predator-prey collisions."""
@@ -349,28 +387,37 @@ def check_interactions():
                 break
 
 def reproduce_agents():
-    """Handle reproduction with trait mutation."""
+    """Handle reproduction with trait mutation, for all ready parents at once."""
     global orcs, dwarves
+    live = [a for a in agents if a.alive]
+    n = len(live)
+    is_orc = np.fromiter((isinstance(a, Orc) for a in live), bool, n)
+    energy = np.fromiter((a.energy for a in live), float, n)
+    ready = energy >= np.where(is_orc, REPRODUCTION_THRESHOLD, DWARF_REPRODUCTION_THRESHOLD)
+    if not ready.any():
+        return
+    parents = [a for a, r in zip(live, ready.tolist()) if r]
+    is_orc, energy = is_orc[ready], energy[ready]
+    # orcs halve their energy, dwarves pass on (1 - DWARF_REPRODUCTION_COST) of it
+    kept = np.where(is_orc, energy // 2, np.trunc(energy * DWARF_REPRODUCTION_COST))
+    given = np.where(is_orc, energy // 2, np.trunc(energy * (1 - DWARF_REPRODUCTION_COST)))
+    speed = mutate_traits(
+        np.fromiter((a.speed for a in parents), float, len(parents)),
+        np.where(is_orc, ORC_MIN_SPEED, DWARF_MIN_SPEED),
+        np.where(is_orc, ORC_MAX_SPEED, DWARF_MAX_SPEED), rng)
+    vision = mutate_traits(
+        np.fromiter((a.vision_radius for a in parents), float, len(parents)),
+        np.where(is_orc, ORC_MIN_VISION_RADIUS, DWARF_MIN_VISION_RADIUS),
+        np.where(is_orc, ORC_MAX_VISION_RADIUS, DWARF_MAX_VISION_RADIUS), rng)
     new_agents = []
-    for a in agents:
-        if not a.alive:
-            continue
-        if isinstance(a, Dwarf) and a.energy >= DWARF_REPRODUCTION_THRESHOLD:
-            off = int(a.energy * (1 - DWARF_REPRODUCTION_COST))
-            a.energy = int(a.energy * DWARF_REPRODUCTION_COST)
-            child_speed = mutate_trait(a.speed, DWARF_MIN_SPEED, DWARF_MAX_SPEED)
-            child_vis   = mutate_trait(a.vision_radius, DWARF_MIN_VISION_RADIUS, DWARF_MAX_VISION_RADIUS)
-            new_agents.append(Dwarf(a.x, a.y, off, child_speed, child_vis))
-            if repro_sound: repro_sound.play()
-            log_event(f"Turn {turn_counter}: Dwarf reproduced @({a.x},{a.y})")
-        elif isinstance(a, Orc) and a.energy >= REPRODUCTION_THRESHOLD:
-            off = a.energy // 2
-            a.energy //= 2
-            child_speed = mutate_trait(a.speed, ORC_MIN_SPEED, ORC_MAX_SPEED)
-            child_vis   = mutate_trait(a.vision_radius, ORC_MIN_VISION_RADIUS, ORC_MAX_VISION_RADIUS)
-            new_agents.append(Orc(a.x, a.y, off, child_speed, child_vis))
-            if repro_sound: repro_sound.play()
-            log_event(f"Turn {turn_counter}: Orc reproduced @({a.x},{a.y})")
+    for a, orc, k, g, s, v in zip(parents, is_orc.tolist(), kept.tolist(), given.tolist(),
+                                  speed.tolist(), vision.tolist()):
+        a.energy = k
+        new_agents.append((Orc if orc else Dwarf)(a.x, a.y, g, s, v))
+    if repro_sound: repro_sound.play()
+    log_events([f"Turn {turn_counter}: {'Orc' if isinstance(a, Orc) else 'Dwarf'} reproduced @({a.x},{a.y})"
+                for a in parents])
+    record_lineage(new_agents, parents)
     agents.extend(new_agents)
     orcs    = [x for x in agents if isinstance(x, Orc)]
     dwarves = [x for x in agents if isinstance(x, Dwarf)]
@@ -387,17 +434,20 @@ def update_resources():
 
 def draw_minimap():
     """Render small map showing agent positions."""
+    global minimap_base
     size = int(GRID_SIZE * CELL_SIZE * MINIMAP_SCALE)
-    m = pygame.Surface((size, size))
-    m.fill((0,0,0))
     scale = MINIMAP_SCALE * CELL_SIZE
-    for ox, oy in obstacles:
-        pygame.draw.rect(m, OBSTACLE_COLOR, (int(ox*scale), int(oy*scale), int(scale), int(scale)))
-    for a in agents:
-        if not a.alive: continue
-        col = ORC_COLOR if isinstance(a, Orc) else DWARF_COLOR
-        pygame.draw.rect(m, col, (int(a.x*scale), int(a.y*scale), 2, 2))
-    screen.blit(m, (WINDOW_WIDTH - size - MINIMAP_PADDING, MINIMAP_PADDING))
+    if minimap_base is None:
+        minimap_base = pygame.Surface((size, size))
+        minimap_base.fill((0,0,0))
+        for ox, oy in obstacles:
+            pygame.draw.rect(minimap_base, OBSTACLE_COLOR,
+                             (int(ox*scale), int(oy*scale), int(scale), int(scale)))
+    m = minimap_base.copy()
+    for i in np.flatnonzero(view["alive"]).tolist():
+        col = ORC_COLOR if view["is_orc"][i] else DWARF_COLOR
+        pygame.draw.rect(m, col, (int(view["x"][i]*scale), int(view["y"][i]*scale), 2, 2))
+    dirty_rects.append(screen.blit(m, (WINDOW_WIDTH - size - MINIMAP_PADDING, MINIMAP_PADDING)))
 
 def draw_event_log():
     """Display recent events in the corner."""
@@ -409,56 +459,107 @@ def draw_event_log():
     for i, msg in enumerate(event_log):
         line = font.render(msg[-30:], True, UI_FONT_COLOR)
         surf.blit(line, (4, 4 + i*18))
-    screen.blit(surf, (10, 10))
+    dirty_rects.append(screen.blit(surf, (10, 10)))
+
+def draw_heatmap():
+    """Blit the heatmap, rebuilding its cached surface only after a tick."""
+    global heat_source
+    if view["heatmap"] is not heat_source:
+        heat_source = view["heatmap"]
+        level = (heat_source * (255 / max(heat_source.max(), 1e-9))).astype(np.uint8)
+        surfarray.blit_array(heat_cells, heat_colors[level])
+        alpha = surfarray.pixels_alpha(heat_cells)
+        alpha[:] = (level.astype(np.uint16) * HEATMAP_ALPHA // 255).astype(np.uint8)
+        del alpha
+        pygame.transform.scale(heat_cells, heat_layer.get_size(), heat_layer)
+    screen.blit(heat_layer, (0, 0))
+
+def sky():
+    """Background variant for the drawn snapshot's time of day and weather."""
+    if view["weather"] == "storm":
+        return "storm"
+    return "day" if view["day"] else "night"
+
+def background_layer():
+    """Return the cached background and whether it was rebuilt."""
+    global background, background_key
+    key = (sky(), tuple(view["resources"]))
+    if key == background_key:
+        return background, False
+    if key[0] not in terrain_layers:
+        layer = pygame.Surface(WINDOW_SIZE).convert()
+        layer.fill(BACKGROUND_COLORS[key[0]])
+        for ox, oy in obstacles:
+            pygame.draw.rect(layer, OBSTACLE_COLOR,
+                             (ox*CELL_SIZE, oy*CELL_SIZE, CELL_SIZE, CELL_SIZE))
+        terrain_layers[key[0]] = layer
+    background = terrain_layers[key[0]].copy()
+    for rx, ry in view["resources"]:
+        pygame.draw.circle(background, (0,255,0),
+                           (rx*CELL_SIZE + CELL_SIZE//2, ry*CELL_SIZE + CELL_SIZE//2),
+                           CELL_SIZE//3)
+    background_key = key
+    return background, True
+
+def begin_frame():
+    """Restore the background under last frame's drawings.
+
+    Returns True when the whole screen was repainted (background change,
+    rain, heatmap or game over, and the frame after any of them turns off),
+    in which case it must be flipped entirely.
+    """
+    global dirty_rects, last_rects, last_overlays
+    bg, rebuilt = background_layer()
+    overlays = (view["weather"] == "rain", show_heatmap, view["game_over"])
+    full = rebuilt or any(overlays) or overlays != last_overlays
+    last_overlays = overlays
+    if full:
+        screen.blit(bg, (0, 0))
+    else:
+        for r in dirty_rects:
+            screen.blit(bg, r, r)
+    last_rects, dirty_rects = dirty_rects, []
+    return full
+
+def draw_trail(i, predator):
+    """Render the fading trail behind agent ``i`` and return the touched rects."""
+    rects = []
+    k = trail_len[i]
+    color = ORC_COLOR if predator else DWARF_COLOR
+    for j, (tx, ty) in enumerate(trails[i, TRAIL_LENGTH - k:].tolist()):
+        surf = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
+        surf.fill((*color, int(255 * (j / k))))
+        rects.append(screen.blit(surf, (tx, ty)))
+    return rects
 
 def draw_grid():
-    """Draw world tiles, effects and agents."""
-    bg = DAY_BG_COLOR if day else NIGHT_BG_COLOR
-    if weather_state == "storm":
-        bg = (20,20,60)
-    screen.fill(bg)
-
-    if weather_state == "rain":
+    """Draw effects and agents over the cached background."""
+    if view["weather"] == "rain":
         for _ in range(50):
             x = random.randrange(WINDOW_WIDTH)
             y = random.randrange(WINDOW_HEIGHT)
             pygame.draw.line(screen, (180,180,255), (x,y), (x,y+5))
 
     if show_heatmap:
-        m_h = max(max(row) for row in heatmap) or 1
-        for i in range(GRID_SIZE):
-            for j in range(GRID_SIZE):
-                if heatmap[i][j]:
-                    inten = min(255, int(heatmap[i][j]/m_h*255))
-                    s = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
-                    s.fill((inten, 0, 0, 100))
-                    screen.blit(s, (i*CELL_SIZE, j*CELL_SIZE))
-
-    for rx, ry in resource_nodes:
-        pygame.draw.circle(screen, (0,255,0),
-                           (rx*CELL_SIZE + CELL_SIZE//2, ry*CELL_SIZE + CELL_SIZE//2),
-                           CELL_SIZE//3)
-
-    for ox, oy in obstacles:
-        pygame.draw.rect(screen, OBSTACLE_COLOR,
-                         (ox*CELL_SIZE, oy*CELL_SIZE, CELL_SIZE, CELL_SIZE))
-
-    for a in agents:
-        if not a.alive: continue
-        a.draw_trail(screen)
-        xpix, ypix = int(a.pos_x), int(a.pos_y)
-        img = orc_img if isinstance(a, Orc) else dwarf_img
-        screen.blit(img, (xpix, ypix))
-        if a.is_predator:
+        draw_heatmap()
+
+    is_orc, is_predator = view["is_orc"].tolist(), view["is_predator"].tolist()
+    energy = view["energy"].tolist()
+    for i in np.flatnonzero(view["alive"]).tolist():
+        dirty_rects.extend(draw_trail(i, is_predator[i]))
+        xpix, ypix = int(anim[i, 0]), int(anim[i, 1])
+        img = orc_img if is_orc[i] else dwarf_img
+        dirty_rects.append(screen.blit(img, (xpix, ypix)))
+        if is_predator[i]:
             pygame.draw.rect(screen, PREDATOR_HIGHLIGHT,
                              (xpix, ypix, CELL_SIZE, CELL_SIZE), 2)
 
         bar_y = ypix - HEALTH_BAR_HEIGHT - 2
-        max_e = REPRODUCTION_THRESHOLD if isinstance(a, Orc) else DWARF_REPRODUCTION_THRESHOLD
-        ratio = max(0.0, min(a.energy / max_e, 1.0))
+        max_e = REPRODUCTION_THRESHOLD if is_orc[i] else DWARF_REPRODUCTION_THRESHOLD
+        ratio = max(0.0, min(energy[i] / max_e, 1.0))
         bg_rect = pygame.Rect(xpix, bar_y, CELL_SIZE, HEALTH_BAR_HEIGHT)
         fg_rect = pygame.Rect(xpix, bar_y, int(CELL_SIZE * ratio), HEALTH_BAR_HEIGHT)
-        pygame.draw.rect(screen, (50,50,50), bg_rect)
+        dirty_rects.append(pygame.draw.rect(screen, (50,50,50), bg_rect))
         color = (int(255*(1-ratio)), int(255*ratio), 0)
         pygame.draw.rect(screen, color, fg_rect)
 
@@ -469,25 +570,23 @@ def draw_grid():
 def draw_ui():
     """Render status bars and history graph."""
     font = pygame.font.SysFont(None, 24)
-    oa = sum(1 for a in agents if isinstance(a, Orc) and a.alive)
-    da = sum(1 for a in agents if isinstance(a, Dwarf) and a.alive)
+    oa = int((view["alive"] & view["is_orc"]).sum())
+    da = int((view["alive"] & ~view["is_orc"]).sum())
     save_high_score(oa + da)
-    rin = max(0, RESOURCE_RESPAWN_TIMER - (turn_counter - last_resource_spawn))
-    status = (f"Turn:{turn_counter} "
-              f"OrcsAlive:{oa} OrcsDead:{orc_deaths} "
-              f"DwarvesAlive:{da} DwarvesDead:{dwarf_deaths} "
-              f"Day:{day} Weather:{weather_state} "
-              f"Paused:{paused} Fast:{fast_mode} Heatmap:{show_heatmap} "
-              f"NextRes:{rin} HighScore:{high_score}")
+    speed = "Turbo" if turbo else "Fast" if fast_mode else "Normal"
+    dirty_rects.append(pygame.Rect(0, GRID_SIZE*CELL_SIZE, WINDOW_WIDTH, UI_HEIGHT + CHART_HEIGHT))
+    status = (f"Turn:{view['turn']} "
+              f"OrcsAlive:{oa} OrcsDead:{view['orc_deaths']} "
+              f"DwarvesAlive:{da} DwarvesDead:{view['dwarf_deaths']} "
+              f"Day:{view['day']} Weather:{view['weather']} "
+              f"Paused:{paused} Speed:{speed} Heatmap:{show_heatmap} "
+              f"NextRes:{view['next_resource']} HighScore:{high_score}")
     screen.blit(font.render(status, True, UI_FONT_COLOR),
                 (10, GRID_SIZE*CELL_SIZE + 10))
     fps_text = font.render(f"FPS:{int(clock.get_fps())}", True, UI_FONT_COLOR)
     screen.blit(fps_text, (WINDOW_WIDTH - 100, GRID_SIZE*CELL_SIZE + 50))
 
     # History chart
-    turn_history.append(turn_counter)
-    orc_history.append(oa)
-    dwarf_history.append(da)
     top = GRID_SIZE*CELL_SIZE + UI_HEIGHT
     bot = top + CHART_HEIGHT
     pygame.draw.line(screen, UI_FONT_COLOR, (10, bot-10), (WINDOW_WIDTH-10, bot-10), 1)
@@ -508,19 +607,161 @@ def draw_ui():
 def draw_game_over():
     """Overlay game-over message."""
     font = pygame.font.SysFont(None, 48)
-    text = font.render(game_over_message, True, (255,255,255))
+    text = font.render(view["game_over_message"], True, (255,255,255))
     rect = text.get_rect(center=(WINDOW_WIDTH//2, WINDOW_HEIGHT//2))
     overlay = pygame.Surface(WINDOW_SIZE, pygame.SRCALPHA)
     overlay.fill((0,0,0,180))
     screen.blit(overlay, (0,0))
     screen.blit(text, rect)
 
+def simulation_tick():
+    """Advance the world by one turn."""
+    global turn_counter, game_over, paused, game_over_message
+    turn_counter += 1
+
+    # Dynamic reinforcement: slows every 500 turns
+    phase    = turn_counter // 500
+    interval = REINFORCEMENT_INTERVAL * (1 + phase)
+    if turn_counter % interval == 0:
+        reinforcement_event()
+
+    if turn_counter % DAY_DURATION == 0:
+        switch_roles()
+    update_weather()
+    update_agents()
+    check_interactions()
+    reproduce_agents()
+    update_resources()
+
+    # Game-over check
+    oa = sum(1 for a in agents if isinstance(a, Orc)   and a.alive)
+    da = sum(1 for a in agents if isinstance(a, Dwarf) and a.alive)
+    if not game_over and (oa == 0 or da == 0 or turn_counter >= MAX_TURNS):
+        game_over = True
+        paused = True
+        if oa == 0 and da == 0:
+            winner = None
+            game_over_message = "Draw — all perished!"
+        elif oa == 0:
+            winner = "Dwarves"
+            game_over_message = "Dwarves Win!"
+        elif da == 0:
+            winner = "Orcs"
+            game_over_message = "Orcs Win!"
+        else:
+            winner = None
+            game_over_message = f"Draw — reached {MAX_TURNS} turns!"
+        log_event(f"Game Over: {game_over_message}")
+        update_learning(winner)
+
+    new_history.append((turn_counter, oa, da))
+    if recorder:
+        recorder.record(turn_counter, agents, resource_nodes, day, weather_state)
+    publish_state()
+
+def publish_state():
+    """Snapshot what the renderer draws (call under ``sim_lock``)."""
+    global frame_state
+    n = len(agents)
+    frame_state = {
+        "turn": turn_counter,
+        "x": np.fromiter((a.x for a in agents), np.int64, n),
+        "y": np.fromiter((a.y for a in agents), np.int64, n),
+        "alive": np.fromiter((a.alive for a in agents), bool, n),
+        "energy": np.fromiter((a.energy for a in agents), float, n),
+        "is_orc": np.fromiter((isinstance(a, Orc) for a in agents), bool, n),
+        "is_predator": np.fromiter((a.is_predator for a in agents), bool, n),
+        "resources": list(resource_nodes),
+        "day": day,
+        "weather": weather_state,
+        "orc_deaths": orc_deaths,
+        "dwarf_deaths": dwarf_deaths,
+        "next_resource": max(0, RESOURCE_RESPAWN_TIMER - (turn_counter - last_resource_spawn)),
+        "game_over": game_over,
+        "game_over_message": game_over_message,
+        "heatmap": heatmap.copy(),
+    }
+
+def take_updates():
+    """Hand the renderer the latest snapshot and the events, kills and
+    population counts queued since it last asked (call under ``sim_lock``)."""
+    global new_events, new_kills, new_history
+    updates = frame_state, new_events, new_kills, new_history
+    new_events, new_kills, new_history = [], [], []
+    return updates
+
+def sample(state, events, kills, history):
+    """Switch the renderer to ``state`` and apply the queued updates."""
+    global view, anim, trails, trail_len
+    if state is not view:
+        n, old = len(state["x"]), len(anim)
+        cells = np.stack([state["x"], state["y"]], axis=1) * CELL_SIZE
+        anim = np.concatenate([anim, cells[old:]])
+        trails = np.concatenate([trails, np.zeros((n - old, TRAIL_LENGTH, 2))])
+        trail_len = np.concatenate([trail_len, np.zeros(n - old, dtype=int)])
+        if view is not None:
+            # agents that changed cell leave their eased position behind
+            moved = np.flatnonzero((view["x"] != state["x"][:old]) | (view["y"] != state["y"][:old]))
+            trails[moved, :-1] = trails[moved, 1:]
+            trails[moved, -1] = anim[moved]
+            trail_len[moved] = np.minimum(trail_len[moved] + 1, TRAIL_LENGTH)
+        view = state
+    event_log.extend(events)
+    del event_log[:-LOG_OVERLAY_MAX]
+    for cx, cy in kills:
+        kill_particles.spawn(cx*CELL_SIZE + CELL_SIZE//2, cy*CELL_SIZE + CELL_SIZE//2,
+                             KILL_PARTICLE_COUNT, CELL_SIZE/10)
+    for t, oa, da in history:
+        turn_history.append(t)
+        orc_history.append(oa)
+        dwarf_history.append(da)
+
+def update_animation():
+    """Ease every agent toward its cell in the drawn snapshot."""
+    cells = np.stack([view["x"], view["y"]], axis=1) * CELL_SIZE
+    anim[:] += (cells - anim) / ANIMATION_STEPS
+
+def simulation_loop():
+    """Run turns on the worker thread at SIM_TICK_RATE, FAST_FPS or flat out.
+
+    Each turn runs under ``sim_lock`` and ends by publishing a snapshot, so
+    the renderer only ever draws the state between two complete turns and
+    holds the lock just long enough to take it.
+    """
+    global running
+    next_tick = time.perf_counter()
+    try:
+        while running:
+            if paused:
+                time.sleep(1 / FPS)
+                next_tick = time.perf_counter()
+                continue
+            with sim_lock:
+                simulation_tick()
+            if turbo:
+                time.sleep(0)  # let the renderer take the lock
+                next_tick = time.perf_counter()
+                continue
+            next_tick += 1 / (FAST_FPS if fast_mode else SIM_TICK_RATE)
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()  # fell behind, don't catch up
+    finally:
+        running = False
+
 # Start
+record_lineage(agents)
 switch_roles()
+publish_state()
 
 running = True
+sim_lock = threading.Lock()
+sim_thread = threading.Thread(target=simulation_loop, daemon=True)
+sim_thread.start()
 while running:
-    clock.tick(FAST_FPS if fast_mode else FPS)
+    clock.tick(FPS)
     for e in pygame.event.get():
         if e.type == pygame.QUIT:
             running = False
@@ -537,53 +778,32 @@ while running:
                     if s: s.set_volume(vol)
             if e.key == pygame.K_f:
                 fast_mode = not fast_mode
+            if e.key == pygame.K_t:
+                turbo = not turbo
             if e.key == pygame.K_r:
                 # Anında reinforcement
-                reinforcement_event()
-
-    if not paused:
-        turn_counter += 1
-
-        # Dynamic reinforcement: slows every 500 turns
-        phase    = turn_counter // 500
-        interval = REINFORCEMENT_INTERVAL * (1 + phase)
-        if turn_counter % interval == 0:
-            reinforcement_event()
-
-        if turn_counter % DAY_DURATION == 0:
-            switch_roles()
-        update_weather()
-        update_agents()
-        check_interactions()
-        reproduce_agents()
-        update_resources()
-        update_kill_particles(clock.get_time()/1000.0)
-
-        # Game-over check
-        oa = sum(1 for a in agents if isinstance(a, Orc)   and a.alive)
-        da = sum(1 for a in agents if isinstance(a, Dwarf) and a.alive)
-        if not game_over and (oa == 0 or da == 0 or turn_counter >= MAX_TURNS):
-            game_over = True
-            paused = True
-            if oa == 0 and da == 0:
-                winner = None
-                game_over_message = "Draw — all perished!"
-            elif oa == 0:
-                winner = "Dwarves"
-                game_over_message = "Dwarves Win!"
-            elif da == 0:
-                winner = "Orcs"
-                game_over_message = "Orcs Win!"
-            else:
-                winner = None
-                game_over_message = f"Draw — reached {MAX_TURNS} turns!"
-            log_event(f"Game Over: {game_over_message}")
-            update_learning(winner)
-
+                with sim_lock:
+                    reinforcement_event()
+                    publish_state()
+
+    with sim_lock:
+        updates = take_updates()
+    sample(*updates)
+    update_animation()
+    update_kill_particles(clock.get_time()/1000.0)
+    full_redraw = begin_frame()
     draw_grid()
     draw_ui()
-    if game_over:
+    if view["game_over"]:
         draw_game_over()
-    pygame.display.flip()
-
+    if full_redraw:
+        pygame.display.flip()
+    else:
+        pygame.display.update(last_rects + dirty_rects)
+
+sim_thread.join()
+if recorder:
+    recorder.close()
+if lineage:
+    lineage.save(LINEAGE_FILE)
 pygame.quit()
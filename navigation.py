@@ -0,0 +1,108 @@
+# navigation.py
+
+import numpy as np
+from config import *
+
+# Moves an agent can take in one step (it may move diagonally), index 8 is "stay".
+MOVES = np.array([(1, 0), (-1, 0), (0, 1), (0, -1),
+                  (1, 1), (1, -1), (-1, 1), (-1, -1), (0, 0)])
+UNREACHABLE = np.iinfo(np.int32).max
+
+
+def neighbour_table(grid_size=GRID_SIZE):
+    """``(grid_size**2, 8)`` cell indices reached by each of the first eight
+    ``MOVES`` from every cell (``x * grid_size + y``), wrapping around."""
+    cells = np.arange(grid_size * grid_size)
+    x, y = cells // grid_size, cells % grid_size
+    return (((x[:, None] + MOVES[:8, 0]) % grid_size) * grid_size
+            + (y[:, None] + MOVES[:8, 1]) % grid_size)
+
+
+class DistanceField:
+    """Steps from every cell to the nearest of a set of targets.
+
+    Distances come from a breadth-first search over the free cells of the
+    torus, moving like the agents do (8 neighbours).  Every cell remembers
+    which target it leads to, so adding a target only relaxes the cells it
+    is now closest to and removing one only re-searches the cells that led
+    to it.  After each change the field stores the downhill move of every
+    cell, so ``step`` is a table lookup shared by all agents.  Cells are
+    indexed ``x * grid_size + y``.
+    """
+
+    def __init__(self, obstacles, grid_size=GRID_SIZE):
+        self.grid_size = grid_size
+        n = grid_size * grid_size
+        self.neighbours = neighbour_table(grid_size)
+        self.free = np.ones(n, dtype=bool)
+        for ox, oy in obstacles:
+            self.free[ox * grid_size + oy] = False
+        self.dist = np.full(n, UNREACHABLE, dtype=np.int32)
+        self.owner = np.full(n, -1, dtype=np.int64)
+        self.move = np.full(n, 8, dtype=np.int64)
+        self.targets = set()
+
+    def cell(self, x, y):
+        return x * self.grid_size + y
+
+    def update(self, targets):
+        """Bring the field in line with ``targets`` (a list of ``(x, y)``)."""
+        targets = {self.cell(x, y) for x, y in targets}
+        added, removed = targets - self.targets, self.targets - targets
+        if not added and not removed:
+            return
+        self.targets = targets
+        seeds = []
+        if removed:
+            region = np.flatnonzero(np.isin(self.owner, list(removed)))
+            self.dist[region] = UNREACHABLE
+            self.owner[region] = -1
+            border = self.neighbours[region].ravel()
+            seeds.append(border[self.owner[border] >= 0])
+        if added:
+            added = np.fromiter(added, np.int64, len(added))
+            self.dist[added] = 0
+            self.owner[added] = added
+            seeds.append(added)
+        self._relax(np.unique(np.concatenate(seeds)))
+        self._update_moves()
+
+    def _relax(self, seeds):
+        """Breadth-first search outward from ``seeds``, whose distances are
+        final, lowering every cell that can now be reached sooner."""
+        if not len(seeds):
+            return
+        d = int(self.dist[seeds].min())
+        frontier = seeds[self.dist[seeds] == d]
+        pending = seeds[self.dist[seeds] > d]
+        while len(frontier) or len(pending):
+            if not len(frontier):
+                d = int(self.dist[pending].min())
+                frontier = pending[self.dist[pending] == d]
+                pending = pending[self.dist[pending] > d]
+            nb = self.neighbours[frontier].ravel()
+            owner = np.repeat(self.owner[frontier], 8)
+            better = self.free[nb] & (self.dist[nb] > d + 1)
+            nb, first = np.unique(nb[better], return_index=True)
+            self.dist[nb] = d + 1
+            self.owner[nb] = owner[better][first]
+            d += 1
+            frontier = np.concatenate([nb, pending[self.dist[pending] == d]])
+            pending = pending[self.dist[pending] > d]
+
+    def _update_moves(self):
+        around = self.dist[self.neighbours]
+        best = around.argmin(axis=1)
+        downhill = around[np.arange(len(best)), best] < self.dist
+        self.move = np.where(downhill, best, 8)
+
+    def distance(self, x, y):
+        """Steps to the nearest target, ``None`` if none can be reached."""
+        d = self.dist[self.cell(x, y)]
+        return None if d == UNREACHABLE else int(d)
+
+    def step(self, x, y):
+        """``(dx, dy)`` toward the nearest target, ``None`` when on a target
+        or when no target can be reached."""
+        m = self.move[self.cell(x, y)]
+        return None if m == 8 else tuple(MOVES[m])
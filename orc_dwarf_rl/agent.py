@@ -10,16 +10,27 @@ class RLAgent:
     def __init__(self, model):
         self.model = model
 
-    def act(self, observation: np.ndarray) -> int:
+    def act(self, observation: np.ndarray, action_mask: Optional[np.ndarray] = None) -> int:
         """Return action from the underlying policy."""
-        action, _ = self.model.predict(observation, deterministic=True)
-        return int(action)
+        masks = None if action_mask is None else action_mask[None]
+        return int(self.act_batch(observation[None], masks)[0])
+
+    def act_batch(self, observations: np.ndarray, action_masks: Optional[np.ndarray] = None) -> np.ndarray:
+        """Actions for a stacked ``(n_agents, obs_dim)`` batch in one forward pass."""
+        kwargs = {} if action_masks is None else {"action_masks": action_masks}
+        actions, _ = self.model.predict(observations, deterministic=True, **kwargs)
+        return np.asarray(actions, dtype=np.int64).reshape(len(observations))
 
     @classmethod
     def load(cls, path: str):
-        from stable_baselines3.common.base_class import BaseAlgorithm
-        model: BaseAlgorithm = BaseAlgorithm.load(path)
+        from sb3_contrib import MaskablePPO
+        model = MaskablePPO.load(path)
         return cls(model)
 
     def save(self, path: str):
         self.model.save(path)
+
+    def export(self, path: str):
+        """Write the policy weights to a ``.npz`` usable by ``NumpyPolicy``."""
+        from orc_dwarf_rl.numpy_policy import export_policy
+        return export_policy(self.model, path)
@@ -0,0 +1,177 @@
+"""Many Orc-Dwarf worlds stepped at once as a Stable-Baselines3 ``VecEnv``."""
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from orc_dwarf_rl import core
+from orc_dwarf_rl.config import (
+    GRID_SIZE,
+    WRAP,
+    OBSTACLE_COUNT,
+    NUM_ORCS,
+    NUM_DWARFS,
+    RESOURCE_NODE_COUNT,
+    MAX_STEPS,
+)
+
+
+class ArrayVecEnv(VecEnv):
+    """``VecEnv`` plumbing shared by the array-backed environments.
+
+    All sub-environments live in one object, so attribute and method access
+    is answered by that object once per requested index.  Methods named in
+    ``slot_methods`` return one row per sub-environment and are split up
+    instead, which lets ``MaskablePPO`` fetch every action mask in one call.
+    """
+
+    render_mode = None
+    slot_methods = ("action_masks",)
+
+    def _indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        if method_name in self.slot_methods:
+            rows = method(*method_args, **method_kwargs)
+            return [rows[i] for i in self._indices(indices)]
+        return [method(*method_args, **method_kwargs) for _ in self._indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._indices(indices)]
+
+
+class BatchedOrcDwarfEnv(ArrayVecEnv):
+    """``num_worlds`` independent worlds held in NumPy arrays.
+
+    Every agent slot of every world is one sub-environment, so ``num_envs``
+    is ``num_worlds * (num_orcs + num_dwarfs)`` and slot ``w * n + i`` is
+    agent ``i`` of world ``w``.  A slot reports ``done`` once when its agent
+    dies and then idles with zero observations and rewards until its world
+    resets, which happens automatically when every agent in it is dead or
+    ``MAX_STEPS`` is reached; the first slot of the world then carries the
+    episode counters in ``info["world_episode"]``.
+
+    ``grid_size``, ``wrap`` and the obstacle layer describe the map (see
+    :mod:`orc_dwarf_rl.core`).  Unless ``obstacles`` is given, a layout of
+    ``num_obstacles`` random cells is drawn once and shared by all worlds.
+    """
+
+    def __init__(self, num_worlds=8, num_orcs=NUM_ORCS, num_dwarfs=NUM_DWARFS, seed=None,
+                 grid_size=GRID_SIZE, wrap=WRAP, num_resources=RESOURCE_NODE_COUNT,
+                 obstacles=None, num_obstacles=OBSTACLE_COUNT):
+        self.num_worlds = num_worlds
+        self.num_orcs = num_orcs
+        self.num_dwarfs = num_dwarfs
+        self.n_agents = num_orcs + num_dwarfs
+        self.grid_size = grid_size
+        self.wrap = wrap
+        self.rng = np.random.default_rng(seed)
+        if obstacles is None and num_obstacles:
+            obstacles = core.random_obstacles(self.rng, grid_size, num_obstacles)
+        self.obstacles = obstacles
+
+        shape = (num_worlds, self.n_agents)
+        self.is_orc = np.arange(self.n_agents) < num_orcs
+        self.pos = np.zeros(shape + (2,), dtype=np.int64)
+        self.energy = np.zeros(shape, dtype=np.int64)
+        self.alive = np.zeros(shape, dtype=bool)
+        self.resources = np.zeros((num_worlds, num_resources, 2), dtype=np.int64)
+        self.steps = np.zeros(num_worlds, dtype=np.int64)
+        # per-world episode counters, column 0 for orcs and 1 for dwarfs
+        self.kills = np.zeros((num_worlds, 2), dtype=np.int64)
+        self.food = np.zeros((num_worlds, 2), dtype=np.int64)
+        self.obs = np.zeros(shape + (core.OBS_DIM,), dtype=np.float32)
+        self.masks = np.ones(shape + (core.N_ACTIONS,), dtype=bool)
+        self.actions = np.zeros(shape, dtype=np.int64)
+
+        observation_space = spaces.Box(low=-1.0, high=1.0, shape=(core.OBS_DIM,), dtype=np.float32)
+        action_space = spaces.Discrete(core.N_ACTIONS)
+        super().__init__(num_worlds * self.n_agents, observation_space, action_space)
+
+    # ------------------------------------------------------------------
+    def _observe(self):
+        core.observe(self.pos, self.energy, self.alive, self.resources,
+                     self.is_orc, self.grid_size, self.obs, self.masks,
+                     self.wrap, self.obstacles)
+        return self.obs.reshape(self.num_envs, core.OBS_DIM)
+
+    def episode_stats(self, world):
+        """Counters of the running episode of ``world`` (see ``metrics``)."""
+        alive = self.alive[world]
+        return {
+            "length": int(self.steps[world]),
+            "orcs_alive": int(alive[self.is_orc].sum()),
+            "dwarfs_alive": int(alive[~self.is_orc].sum()),
+            "orc_kills": int(self.kills[world, 0]),
+            "dwarf_kills": int(self.kills[world, 1]),
+            "orc_food": int(self.food[world, 0]),
+            "dwarf_food": int(self.food[world, 1]),
+        }
+
+    def action_masks(self):
+        """Valid-action mask of every slot for the current observations."""
+        return self.masks.reshape(self.num_envs, core.N_ACTIONS).copy()
+
+    def reset(self):
+        if self._seeds[0] is not None:
+            self.rng = np.random.default_rng(self._seeds[0])
+            self._seeds = [None] * self.num_envs
+        core.reset_worlds(self.rng, self.pos, self.energy, self.alive,
+                          self.resources, self.grid_size, obstacles=self.obstacles)
+        self.steps[:] = 0
+        self.kills[:] = 0
+        self.food[:] = 0
+        return self._observe().copy()
+
+    def step_async(self, actions):
+        self.actions[:] = np.asarray(actions).reshape(self.actions.shape)
+
+    def step_wait(self):
+        was_alive = self.alive.copy()
+        rewards, terminated, kills, eaten = core.step(
+            self.rng, self.pos, self.energy, self.alive, self.resources,
+            self.is_orc, self.actions, self.grid_size, self.wrap, self.obstacles,
+        )
+        self.steps += 1
+        for col, members in enumerate((self.is_orc, ~self.is_orc)):
+            self.kills[:, col] += kills[:, members].sum(axis=1)
+            self.food[:, col] += eaten[:, members].sum(axis=1)
+
+        truncated = self.alive & (self.steps >= MAX_STEPS)[:, None]
+        finished = ~self.alive.any(axis=1) | (self.steps >= MAX_STEPS)
+        # idle slots close their placeholder episode when the world resets
+        idle = ~was_alive & finished[:, None]
+        dones = terminated | truncated | idle
+
+        terminal_obs = self._observe().copy()
+        infos = [{} for _ in range(self.num_envs)]
+        for slot in np.flatnonzero(dones):
+            infos[slot]["terminal_observation"] = terminal_obs[slot]
+            infos[slot]["TimeLimit.truncated"] = bool(truncated.flat[slot])
+
+        if finished.any():
+            worlds = np.flatnonzero(finished)
+            for w in worlds:
+                infos[w * self.n_agents]["world_episode"] = self.episode_stats(w)
+            core.reset_worlds(self.rng, self.pos, self.energy, self.alive,
+                              self.resources, self.grid_size, worlds, self.obstacles)
+            self.steps[worlds] = 0
+            self.kills[worlds] = 0
+            self.food[worlds] = 0
+        obs = self._observe().copy()
+        return obs, rewards.reshape(-1), dones.reshape(-1), infos
+
+    def close(self):
+        pass
@@ -2,6 +2,8 @@
 
 # Map dimensions
 GRID_SIZE = 10
+WRAP = False        # True: the map is a torus, False: movement clamps at the border
+OBSTACLE_COUNT = 0  # Random blocked cells
 
 # Agent counts
 NUM_ORCS = 5
@@ -28,5 +30,18 @@ BATCH_SIZE = 64
 
 # Training / Evaluation settings
 TOTAL_TIMESTEPS = 200_000   # Number of steps for SB3 training
+NUM_WORLDS = 8              # Worlds stepped together by BatchedOrcDwarfEnv
+NUM_WORKERS = 0             # Rollout processes (0 = single in-process env)
 EVAL_EPISODES = 5           # Episodes for evaluation after training
-ENV_RENDER = True           # Render ASCII grid during evaluation
+ENV_RENDER = False          # Print the ASCII grid every evaluation step
+RECORD_PATH = "orc_dwarf_episodes.npz"  # Evaluation frames for offline replay ("" to skip)
+STATS_PATH = "orc_dwarf_stats.npz"  # Episode/throughput metrics (.npz or .csv)
+
+# Self-play league (--self-play)
+LEAGUE_DIR = "league"               # Frozen orc/dwarf policy snapshots
+SELF_PLAY_ITERATIONS = 10           # Training rounds per species
+SELF_PLAY_TIMESTEPS = 20_000        # Steps per species per round
+LATEST_OPPONENT_PROB = 0.5          # Else a uniformly sampled older snapshot
+MATCH_WORLDS = 8                    # Episodes per rating match
+ELO_START = 1000.0
+ELO_K = 32.0
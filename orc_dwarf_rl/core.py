@@ -0,0 +1,306 @@
+"""Array kernels for the Orc-Dwarf rules.
+
+World state lives in NumPy arrays with a leading world axis so that several
+independent worlds can be advanced with a single call:
+
+* ``pos``        ``(B, N, 2)`` integer ``(x, y)`` of every agent
+* ``energy``     ``(B, N)``    integer energy
+* ``alive``      ``(B, N)``    alive mask
+* ``resources``  ``(B, R, 2)`` resource node positions
+* ``is_orc``     ``(N,)``      species of each agent slot (orcs come first)
+
+The map is a square of ``grid_size`` cells that either clamps movement at
+the border or wraps around as a torus (``wrap=True``).  ``obstacles`` is an
+optional ``(grid_size, grid_size)`` boolean layer indexed ``[y, x]`` shared
+by all worlds; nothing spawns on an obstacle and moves into one are
+cancelled.  Distances are Manhattan, measured around the torus when
+wrapping.
+
+The per-agent rules mirror :class:`orc_dwarf_rl.orc_dwarf_env.OrcDwarfEnv`,
+except that every agent acts on the same snapshot of the world (movement
+targets come from the pre-move positions and all attacks of a step resolve
+simultaneously) instead of in dictionary order.
+
+Nearest-target queries use a bucket grid once the worlds get large, so
+perception and stepping cost roughly ``O(N + R)`` per world instead of
+``O(N * (N + R))``.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from orc_dwarf_rl.config import (
+    MAX_ENERGY,
+    INITIAL_ENERGY,
+    DEFAULT_SIGHT,
+    DEFAULT_SPEED,
+    ATTACK_RANGE,
+    RESOURCE_ENERGY,
+)
+
+OBS_DIM = 9  # [x,y,energy,res_x,res_y,enemy_x,enemy_y,sight,speed]
+N_ACTIONS = 9
+
+# (dx, dy) of the four compass moves and "stay" (actions 0-4)
+MOVES = np.array([(0, -1), (0, 1), (1, 0), (-1, 0), (0, 0)], dtype=np.int64) * DEFAULT_SPEED
+
+# per-world query x target pairs up to which brute force beats the bucket grid
+DENSE_PAIRS = 4096
+
+
+def random_obstacles(rng, grid_size, count):
+    """Obstacle layer with ``count`` distinct random cells."""
+    layer = np.zeros((grid_size, grid_size), dtype=bool)
+    layer.flat[rng.choice(grid_size * grid_size, size=count, replace=False)] = True
+    return layer
+
+
+def spawn(rng, shape, grid_size, obstacles=None):
+    """Uniform random free cells of ``shape + (2,)``."""
+    if obstacles is None:
+        return rng.integers(0, grid_size, size=tuple(shape) + (2,))
+    cell = rng.choice(np.flatnonzero(~obstacles.ravel()), size=tuple(shape))
+    return np.stack([cell % grid_size, cell // grid_size], axis=-1)
+
+
+def reset_worlds(rng, pos, energy, alive, resources, grid_size, worlds=None, obstacles=None):
+    """Re-initialise the selected worlds (all of them by default) in place."""
+    if worlds is None:
+        worlds = np.arange(pos.shape[0])
+    pos[worlds] = spawn(rng, (len(worlds), pos.shape[1]), grid_size, obstacles)
+    energy[worlds] = INITIAL_ENERGY
+    alive[worlds] = True
+    resources[worlds] = spawn(rng, (len(worlds), resources.shape[1]), grid_size, obstacles)
+
+
+def offset(src, dst, grid_size, wrap=False):
+    """Per-axis offset from ``src`` to ``dst``, the short way round when wrapping."""
+    delta = dst - src
+    if wrap:
+        delta = (delta + grid_size // 2) % grid_size - grid_size // 2
+    return delta
+
+
+def distance(src, dst, grid_size, wrap=False):
+    return np.abs(offset(src, dst, grid_size, wrap)).sum(axis=-1)
+
+
+def advance(pos, delta, grid_size, wrap=False, obstacles=None):
+    """Position after moving by ``delta``; blocked moves leave it unchanged."""
+    moved = pos + delta
+    moved = moved % grid_size if wrap else np.clip(moved, 0, grid_size - 1)
+    if obstacles is not None:
+        blocked = obstacles[moved[..., 1], moved[..., 0]]
+        moved = np.where(blocked[..., None], pos, moved)
+    return moved
+
+
+def nearest(pos, targets, valid, grid_size, wrap=False):
+    """Index of the closest valid target for every agent.
+
+    ``pos`` is ``(B, N, 2)``, ``targets`` ``(B, M, 2)`` and ``valid`` a
+    per-target mask broadcastable to ``(B, M)``.  Returns ``(index,
+    found)``; ties go to the lowest target index like ``min`` over a list.
+    """
+    n_worlds, n = pos.shape[:2]
+    m = targets.shape[1]
+    valid = np.broadcast_to(valid, (n_worlds, m))
+    if m == 0 or n == 0:
+        return np.zeros((n_worlds, n), dtype=np.int64), np.zeros((n_worlds, n), dtype=bool)
+    if n * m > DENSE_PAIRS:
+        return _bucket_nearest(pos, targets, valid, grid_size, wrap)
+    dist = distance(pos[:, :, None, :], targets[:, None, :, :], grid_size, wrap)
+    dist = np.where(valid[:, None, :], dist, np.iinfo(dist.dtype).max)
+    found = np.repeat(valid.any(axis=-1)[:, None], n, axis=1)
+    return dist.argmin(axis=-1), found
+
+
+@lru_cache(maxsize=None)
+def _ring(r):
+    """Bucket offsets at Chebyshev distance exactly ``r``."""
+    span = np.arange(-r, r + 1)
+    dx, dy = np.meshgrid(span, span, indexing="ij")
+    keep = np.maximum(np.abs(dx), np.abs(dy)) == r
+    return np.stack([dx[keep], dy[keep]], axis=-1)
+
+
+def _bucket_nearest(pos, targets, valid, grid_size, wrap):
+    """``nearest`` by searching rings of buckets outward from each agent.
+
+    The map is cut into about ``M`` buckets and the valid targets are sorted
+    by (world, bucket).  A query is settled after ring ``r`` once its best
+    distance is at most ``r`` times the narrowest bucket width, because
+    every target further out is at least one cell beyond that.
+    """
+    n_worlds, n = pos.shape[:2]
+    m = targets.shape[1]
+    nb = int(min(grid_size, np.ceil(np.sqrt(m))))
+    width = grid_size // nb
+    cells = nb * nb
+
+    tw, tj = np.nonzero(valid)
+    tb = targets[tw, tj] * nb // grid_size
+    tkey = tw * cells + tb[:, 0] * nb + tb[:, 1]
+    order = np.argsort(tkey, kind="stable")
+    counts = np.bincount(tkey, minlength=n_worlds * cells)
+    starts = np.cumsum(counts) - counts
+    sorted_j = tj[order]
+    sorted_pts = targets[tw[order], sorted_j]
+
+    qw = np.repeat(np.arange(n_worlds), n)
+    qp = pos.reshape(-1, 2)
+    qb = qp * nb // grid_size
+    # best distance and target index packed as distance * m + index
+    best = np.full(n_worlds * n, np.iinfo(np.int64).max, dtype=np.int64)
+    pending = np.arange(n_worlds * n)
+    for r in range(nb // 2 + 1 if wrap else nb):
+        ring = _ring(r)
+        cb = qb[pending, None, :] + ring[None]
+        if wrap:
+            cb %= nb
+            inside = np.ones(cb.shape[:2], dtype=bool)
+        else:
+            inside = ((cb >= 0) & (cb < nb)).all(axis=-1)
+            cb = np.clip(cb, 0, nb - 1)
+        key = qw[pending, None] * cells + cb[..., 0] * nb + cb[..., 1]
+        cnt = np.where(inside, counts[key], 0).ravel()
+        total = int(cnt.sum())
+        if total:
+            query = np.repeat(np.repeat(pending, len(ring)), cnt)
+            slot = np.repeat(starts[key].ravel() - (np.cumsum(cnt) - cnt), cnt) + np.arange(total)
+            dist = distance(qp[query], sorted_pts[slot], grid_size, wrap)
+            np.minimum.at(best, query, dist * m + sorted_j[slot])
+        pending = pending[best[pending] >= (r * width + 1) * m]
+        if len(pending) == 0:
+            break
+    found = best < np.iinfo(np.int64).max
+    idx = np.where(found, best % m, 0)
+    return idx.reshape(n_worlds, n), found.reshape(n_worlds, n)
+
+
+def nearest_enemy(pos, alive, is_orc, grid_size, wrap=False):
+    """Closest living agent of the opposite species -> ``(index, found)``."""
+    idx = np.zeros(alive.shape, dtype=np.int64)
+    found = np.zeros(alive.shape, dtype=bool)
+    orcs, dwarfs = np.flatnonzero(is_orc), np.flatnonzero(~is_orc)
+    for hunters, prey in ((orcs, dwarfs), (dwarfs, orcs)):
+        if len(hunters) == 0 or len(prey) == 0:
+            continue
+        j, f = nearest(pos[:, hunters], pos[:, prey], alive[:, prey], grid_size, wrap)
+        idx[:, hunters] = prey[j]
+        found[:, hunters] = f
+    return idx, found
+
+
+def gather(points, idx):
+    """Select ``points[b, idx[b, i]]`` -> ``(B, N, 2)``."""
+    return np.take_along_axis(points, idx[..., None], axis=1)
+
+
+def observe(pos, energy, alive, resources, is_orc, grid_size, out, masks=None,
+            wrap=False, obstacles=None):
+    """Write the observation of every agent into ``out`` ``(B, N, 9)``.
+
+    When ``masks`` ``(B, N, 9)`` is given it receives the valid-action mask
+    computed from the same distances: moves that the wall or an obstacle
+    would cancel, directed moves without a target (or already on it) and
+    attacks without an enemy in ``ATTACK_RANGE`` are masked out.  Dead
+    agents may only stay.
+    """
+    res_idx, has_res = nearest(pos, resources, True, grid_size, wrap)
+    enemy_idx, has_enemy = nearest_enemy(pos, alive, is_orc, grid_size, wrap)
+    res_delta = offset(pos, gather(resources, res_idx), grid_size, wrap) * has_res[..., None]
+    enemy_delta = offset(pos, gather(pos, enemy_idx), grid_size, wrap) * has_enemy[..., None]
+
+    out[..., 0:2] = pos / (grid_size - 1)
+    out[..., 2] = energy / MAX_ENERGY
+    out[..., 3:5] = res_delta / grid_size
+    out[..., 5:7] = enemy_delta / grid_size
+    out[..., 7] = DEFAULT_SIGHT / grid_size
+    out[..., 8] = DEFAULT_SPEED
+    out[~alive] = 0.0
+
+    if masks is not None:
+        here = pos[:, :, None, :]
+        directed = np.stack([np.sign(res_delta), np.sign(enemy_delta), -np.sign(enemy_delta)], axis=2)
+        deltas = np.concatenate([np.broadcast_to(MOVES[:4], pos.shape[:2] + (4, 2)), directed], axis=2)
+        moved = advance(here, deltas, grid_size, wrap, obstacles)
+        changes = (moved != here).any(axis=-1)
+        masks[..., 0:4] = changes[..., 0:4]
+        masks[..., 4] = True
+        masks[..., 5:8] = changes[..., 4:7]
+        masks[..., 8] = has_enemy & (np.abs(enemy_delta).sum(axis=-1) <= ATTACK_RANGE)
+        masks[~alive] = False
+        masks[..., 4] |= ~alive
+    return out
+
+
+def step(rng, pos, energy, alive, resources, is_orc, actions, grid_size,
+         wrap=False, obstacles=None):
+    """Advance every world by one step in place.
+
+    Returns ``(rewards, terminated, kills, eaten)`` where ``kills`` and
+    ``eaten`` are ``(B, N)`` boolean arrays flagging the attackers that
+    scored and the agents that collected a resource this step.
+    """
+    n_worlds, n_agents = alive.shape
+    rewards = np.zeros((n_worlds, n_agents), dtype=np.float32)
+    acting = alive.copy()
+
+    # movement: every directed move looks at the pre-move snapshot
+    res_idx, has_res = nearest(pos, resources, True, grid_size, wrap)
+    enemy_idx, has_enemy = nearest_enemy(pos, alive, is_orc, grid_size, wrap)
+    toward_res = np.sign(offset(pos, gather(resources, res_idx), grid_size, wrap)) * has_res[..., None]
+    toward_enemy = np.sign(offset(pos, gather(pos, enemy_idx), grid_size, wrap)) * has_enemy[..., None]
+
+    delta = np.zeros_like(pos)
+    basic = actions <= 4
+    delta[basic] = MOVES[actions[basic]]
+    delta[actions == 5] = toward_res[actions == 5]
+    delta[actions == 6] = toward_enemy[actions == 6]
+    delta[actions == 7] = -toward_enemy[actions == 7]
+    pos[acting] = advance(pos[acting], delta[acting], grid_size, wrap, obstacles)
+
+    # attacks after movement, resolved simultaneously
+    enemy_idx, has_enemy = nearest_enemy(pos, acting, is_orc, grid_size, wrap)
+    gap = distance(pos, gather(pos, enemy_idx), grid_size, wrap)
+    kills = acting & (actions == 8) & has_enemy & (gap <= ATTACK_RANGE)
+    world, attacker = np.nonzero(kills)
+    victim = enemy_idx[world, attacker]
+    np.add.at(rewards, (world, attacker), 2.0)
+    np.add.at(rewards, (world, victim), -2.0)
+    alive[world, victim] = False
+    killed = acting & ~alive
+
+    # living bonus, hunger and resource collection
+    rewards[alive] += 0.01
+    energy[alive] -= 1
+    claimed, eater = _first_on_cell(pos, alive, resources, grid_size)
+    eaten = np.zeros_like(alive)
+    eaten[np.nonzero(claimed)[0], eater[claimed]] = True
+    rewards[eaten] += 1.0
+    energy[eaten] = np.minimum(MAX_ENERGY, energy[eaten] + RESOURCE_ENERGY)
+    resources[claimed] = spawn(rng, (int(claimed.sum()),), grid_size, obstacles)
+
+    starved = alive & (energy <= 0)
+    rewards[starved] -= 5.0
+    alive[starved] = False
+    terminated = killed | starved
+    return rewards, terminated, kills, eaten
+
+
+def _first_on_cell(pos, alive, points, grid_size):
+    """For every point ``(B, R, 2)``: is a living agent on its cell, and the
+    lowest such agent index.  Sorting the agents' cell keys keeps this
+    ``O((N + R) log N)`` per world."""
+    cells = grid_size * grid_size
+    world, agent = np.nonzero(alive)
+    if len(agent) == 0:
+        return np.zeros(points.shape[:2], dtype=bool), np.zeros(points.shape[:2], dtype=np.int64)
+    key = world * cells + pos[world, agent, 1] * grid_size + pos[world, agent, 0]
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    wanted = np.arange(points.shape[0])[:, None] * cells + points[..., 1] * grid_size + points[..., 0]
+    at = np.minimum(np.searchsorted(key, wanted), len(key) - 1)
+    return key[at] == wanted, agent[order][at]
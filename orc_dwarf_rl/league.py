@@ -0,0 +1,242 @@
+"""Self-play with separate orc and dwarf policies and a league of snapshots.
+
+Each species is trained by its own ``MaskablePPO`` on a ``SpeciesVecEnv``:
+the learner controls its species' slots of a ``BatchedOrcDwarfEnv`` while
+the other species is played by frozen ``NumpyPolicy`` snapshots drawn from
+the ``League``.  Worlds pick their opponent whenever they reset, so one
+vectorised env mixes several opponents; their actions are computed with one
+``act_batch`` call per distinct opponent.
+
+After every training round the new snapshots play evaluation matches
+against the league (in worker processes) and the results update Elo
+ratings.
+"""
+
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from orc_dwarf_rl import core
+from orc_dwarf_rl.batched_env import ArrayVecEnv, BatchedOrcDwarfEnv
+from orc_dwarf_rl.numpy_policy import NumpyPolicy, export_policy
+from orc_dwarf_rl.config import (
+    LEARNING_RATE,
+    NUM_ORCS,
+    NUM_DWARFS,
+    NUM_WORLDS,
+    NUM_WORKERS,
+    LEAGUE_DIR,
+    SELF_PLAY_ITERATIONS,
+    SELF_PLAY_TIMESTEPS,
+    LATEST_OPPONENT_PROB,
+    MATCH_WORLDS,
+    ELO_START,
+    ELO_K,
+)
+
+SPECIES = ("orc", "dwarf")
+
+
+def other(species):
+    return "dwarf" if species == "orc" else "orc"
+
+
+class League:
+    """Frozen policy snapshots of both species with Elo ratings.
+
+    Snapshots are ``.npz`` files written by ``export_policy`` into
+    ``directory``; ``ratings`` maps their paths to Elo scores on one scale
+    shared by orcs and dwarves.
+    """
+
+    def __init__(self, directory=LEAGUE_DIR, latest_prob=LATEST_OPPONENT_PROB):
+        self.directory = directory
+        self.latest_prob = latest_prob
+        self.members = {species: [] for species in SPECIES}
+        self.ratings = {}
+        self._policies = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def add(self, model, species):
+        """Freeze ``model`` as the newest ``species`` member; it starts from
+        its predecessor's rating."""
+        members = self.members[species]
+        path = os.path.join(self.directory, f"{species}_{len(members)}.npz")
+        self._policies[path] = export_policy(model, path)
+        self.ratings[path] = self.ratings[members[-1]] if members else ELO_START
+        members.append(path)
+        return path
+
+    def policy(self, path):
+        if path not in self._policies:
+            self._policies[path] = NumpyPolicy.load(path)
+        return self._policies[path]
+
+    def sample(self, species, rng):
+        """Newest member with probability ``latest_prob``, else a uniform pick."""
+        members = self.members[species]
+        if rng.random() < self.latest_prob:
+            return self.policy(members[-1])
+        return self.policy(members[rng.integers(len(members))])
+
+    def record(self, orc_path, dwarf_path, score):
+        """Elo update for a match in which the orcs scored ``score`` (0-1)."""
+        expected = 1.0 / (1.0 + 10 ** ((self.ratings[dwarf_path] - self.ratings[orc_path]) / 400))
+        change = ELO_K * (score - expected)
+        self.ratings[orc_path] += change
+        self.ratings[dwarf_path] -= change
+
+    def standings(self):
+        ranked = sorted(self.ratings.items(), key=lambda item: -item[1])
+        return "\n".join(f"{rating:7.1f}  {os.path.basename(path)}" for path, rating in ranked)
+
+
+class SpeciesVecEnv(ArrayVecEnv):
+    """The ``species`` slots of a ``BatchedOrcDwarfEnv`` as a ``VecEnv``.
+
+    The other species is played by league members, one per world, chosen
+    again each time the world resets.  Episode counters of a finished world
+    are reported in the ``world_episode`` info of its first learner slot.
+    """
+
+    def __init__(self, species, league, num_worlds=NUM_WORLDS, num_orcs=NUM_ORCS,
+                 num_dwarfs=NUM_DWARFS, seed=None, **env_kwargs):
+        self.env = BatchedOrcDwarfEnv(num_worlds, num_orcs, num_dwarfs, seed=seed, **env_kwargs)
+        self.species = species
+        self.league = league
+        self.rng = np.random.default_rng(seed)
+        self.num_worlds = num_worlds
+        mine = self.env.is_orc if species == "orc" else ~self.env.is_orc
+        self.learner = np.flatnonzero(mine)
+        self.opponent = np.flatnonzero(~mine)
+        self.opponents = [None] * num_worlds
+        super().__init__(num_worlds * len(self.learner), self.env.observation_space,
+                         self.env.action_space)
+
+    def _pick_opponents(self, worlds):
+        for w in worlds:
+            self.opponents[w] = self.league.sample(other(self.species), self.rng)
+
+    def _slots(self, array, slots):
+        """Rows of ``slots`` in every world from a flat per-slot array."""
+        rows = array.reshape((self.num_worlds, self.env.n_agents) + array.shape[1:])
+        return rows[:, slots].reshape((-1,) + array.shape[1:])
+
+    def _opponent_actions(self):
+        obs = self.env.obs[:, self.opponent]
+        masks = self.env.masks[:, self.opponent]
+        actions = np.empty((self.num_worlds, len(self.opponent)), dtype=np.int64)
+        groups = {}
+        for w, policy in enumerate(self.opponents):
+            groups.setdefault(id(policy), (policy, []))[1].append(w)
+        for policy, worlds in groups.values():
+            batch = policy.act_batch(obs[worlds].reshape(-1, core.OBS_DIM),
+                                     masks[worlds].reshape(-1, core.N_ACTIONS))
+            actions[worlds] = batch.reshape(len(worlds), -1)
+        return actions
+
+    def action_masks(self):
+        return self._slots(self.env.action_masks(), self.learner)
+
+    def reset(self):
+        if self._seeds[0] is not None:
+            self.env.seed(self._seeds[0])
+            self._seeds = [None] * self.num_envs
+        obs = self.env.reset()
+        self._pick_opponents(range(self.num_worlds))
+        return self._slots(obs, self.learner)
+
+    def step_async(self, actions):
+        full = self.env.actions
+        full[:, self.learner] = np.asarray(actions).reshape(self.num_worlds, -1)
+        full[:, self.opponent] = self._opponent_actions()
+
+    def step_wait(self):
+        obs, rewards, dones, infos = self.env.step_wait()
+        n, per_world = self.env.n_agents, len(self.learner)
+        mine = [infos[w * n + i] for w in range(self.num_worlds) for i in self.learner]
+        finished = [w for w in range(self.num_worlds) if "world_episode" in infos[w * n]]
+        for w in finished:
+            mine[w * per_world]["world_episode"] = infos[w * n]["world_episode"]
+        self._pick_opponents(finished)
+        return (self._slots(obs, self.learner), self._slots(rewards, self.learner),
+                self._slots(dones, self.learner), mine)
+
+    def close(self):
+        self.env.close()
+
+
+def match_score(episode):
+    """1 if the orcs came out ahead (survivors plus kills), 0.5 for a draw."""
+    orcs = episode["orcs_alive"] + episode["orc_kills"]
+    dwarfs = episode["dwarfs_alive"] + episode["dwarf_kills"]
+    return 0.5 + 0.5 * np.sign(orcs - dwarfs)
+
+
+def play_match(orc_path, dwarf_path, num_worlds=MATCH_WORLDS, seed=None):
+    """Mean orc score over one episode in each of ``num_worlds`` worlds."""
+    env = BatchedOrcDwarfEnv(num_worlds, seed=seed)
+    orc, dwarf = NumpyPolicy.load(orc_path), NumpyPolicy.load(dwarf_path)
+    orcs, dwarfs = np.flatnonzero(env.is_orc), np.flatnonzero(~env.is_orc)
+    env.reset()
+    scores = {}
+    while len(scores) < num_worlds:
+        actions = env.actions
+        for policy, slots in ((orc, orcs), (dwarf, dwarfs)):
+            batch = policy.act_batch(env.obs[:, slots].reshape(-1, core.OBS_DIM),
+                                     env.masks[:, slots].reshape(-1, core.N_ACTIONS))
+            actions[:, slots] = batch.reshape(num_worlds, -1)
+        _, _, _, infos = env.step(actions.reshape(-1))
+        for w in range(num_worlds):
+            episode = infos[w * env.n_agents].get("world_episode")
+            if episode is not None and w not in scores:
+                scores[w] = match_score(episode)
+    return float(np.mean(list(scores.values())))
+
+
+def play_matches(pairs, workers=NUM_WORKERS, num_worlds=MATCH_WORLDS):
+    """Scores of ``(orc_path, dwarf_path)`` matches, spread over ``workers``
+    processes (``0`` plays them in-process)."""
+    orc_paths, dwarf_paths = zip(*pairs) if pairs else ((), ())
+    worlds = [num_worlds] * len(pairs)
+    if workers <= 0:
+        return list(map(play_match, orc_paths, dwarf_paths, worlds))
+    method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+    with ProcessPoolExecutor(workers, mp_context=mp.get_context(method)) as pool:
+        return list(pool.map(play_match, orc_paths, dwarf_paths, worlds))
+
+
+def self_play(iterations=SELF_PLAY_ITERATIONS, timesteps=SELF_PLAY_TIMESTEPS,
+              num_worlds=NUM_WORLDS, workers=NUM_WORKERS, league_dir=LEAGUE_DIR):
+    """Alternately train each species against the league, then rate the new
+    snapshots against every member of the other species."""
+    from sb3_contrib import MaskablePPO
+
+    league = League(league_dir)
+    envs = {s: SpeciesVecEnv(s, league, num_worlds) for s in SPECIES}
+    models = {
+        s: MaskablePPO(policy="MlpPolicy", env=envs[s], learning_rate=LEARNING_RATE, verbose=0)
+        for s in SPECIES
+    }
+    for s in SPECIES:
+        league.add(models[s], s)
+
+    for it in range(iterations):
+        newest = {}
+        for s in SPECIES:
+            models[s].learn(total_timesteps=timesteps, reset_num_timesteps=False)
+            newest[s] = league.add(models[s], s)
+        pairs = [(newest["orc"], d) for d in league.members["dwarf"]]
+        pairs += [(o, newest["dwarf"]) for o in league.members["orc"][:-1]]
+        for (orc_path, dwarf_path), score in zip(pairs, play_matches(pairs, workers)):
+            league.record(orc_path, dwarf_path, score)
+        print(f"Self-play round {it + 1}/{iterations}")
+        print(league.standings())
+
+    for s in SPECIES:
+        models[s].save(f"orc_dwarf_{s}_model")
+        export_policy(models[s], f"orc_dwarf_{s}_policy.npz")
+        envs[s].close()
+    return league
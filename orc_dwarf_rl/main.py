@@ -1,48 +1,130 @@
+import argparse
+import time
+
+import numpy as np
 from sb3_contrib import MaskablePPO
 import supersuit as ss
 
 # Absolute imports allow running this script directly with ``python main.py``
 # while still functioning when used as a module via ``python -m orc_dwarf_rl.main``.
+from orc_dwarf_rl.agent import RLAgent
 from orc_dwarf_rl.orc_dwarf_env import OrcDwarfEnv
-from orc_dwarf_rl.config import LEARNING_RATE, NUM_ORCS, NUM_DWARFS
+from orc_dwarf_rl.batched_env import BatchedOrcDwarfEnv
+from orc_dwarf_rl.parallel import SharedMemoryVecEnv
+from orc_dwarf_rl.metrics import EpisodeStats, ThroughputCallback
+from orc_dwarf_rl.rendering import EpisodeRecorder
+from orc_dwarf_rl.league import self_play
+from orc_dwarf_rl.config import (
+    LEARNING_RATE,
+    NUM_ORCS,
+    NUM_DWARFS,
+    NUM_WORLDS,
+    NUM_WORKERS,
+    TOTAL_TIMESTEPS,
+    EVAL_EPISODES,
+    STATS_PATH,
+    ENV_RENDER,
+    RECORD_PATH,
+    SELF_PLAY_ITERATIONS,
+    SELF_PLAY_TIMESTEPS,
+)
 
 
-def train(total_timesteps=200000):
-    env = OrcDwarfEnv(num_orcs=NUM_ORCS, num_dwarfs=NUM_DWARFS)
-    env = ss.pad_observations_v0(env)
-    env = ss.pad_action_space_v0(env)
+def make_train_env(num_worlds=NUM_WORLDS, num_workers=NUM_WORKERS):
+    """In-process batched worlds, or ``num_workers`` processes of them."""
+    if num_workers > 0:
+        return SharedMemoryVecEnv(num_workers=num_workers, worlds_per_worker=num_worlds,
+                                  num_orcs=NUM_ORCS, num_dwarfs=NUM_DWARFS)
+    return BatchedOrcDwarfEnv(num_worlds=num_worlds, num_orcs=NUM_ORCS, num_dwarfs=NUM_DWARFS)
+
+
+def train(total_timesteps=TOTAL_TIMESTEPS, num_worlds=NUM_WORLDS, num_workers=NUM_WORKERS,
+          stats_path=STATS_PATH):
+    env = make_train_env(num_worlds, num_workers)
     model = MaskablePPO(
         policy="MlpPolicy",
         env=env,
         learning_rate=LEARNING_RATE,
         verbose=1,
     )
-    model.learn(total_timesteps=total_timesteps)
+    stats = EpisodeStats()
+    start = time.perf_counter()
+    model.learn(total_timesteps=total_timesteps, callback=ThroughputCallback(stats))
+    elapsed = time.perf_counter() - start
+    print(f"Collected {model.num_timesteps} env steps from {env.num_envs} slots "
+          f"in {elapsed:.1f}s ({model.num_timesteps / elapsed:.0f} steps/s)")
+    print(stats.summary())
+    if stats_path:
+        stats.save(stats_path)
+    env.close()
     model.save("orc_dwarf_model")
     return model
 
 
-def evaluate(model_path="orc_dwarf_model", episodes=5):
-    model = MaskablePPO.load(model_path)
-    env = OrcDwarfEnv()
+def evaluate(model_path="orc_dwarf_model", episodes=5, render=ENV_RENDER, record_path=RECORD_PATH):
+    agent = RLAgent.load(model_path)
+    base = env = OrcDwarfEnv(render_mode="human")
+    stats = EpisodeStats()
+    recorder = EpisodeRecorder() if record_path else None
     env = ss.pad_observations_v0(env)
     env = ss.pad_action_space_v0(env)
     for ep in range(episodes):
-        observations = env.reset()
+        observations, infos = env.reset()
+        if recorder:
+            recorder.add(base.frame())
         terminated = {a: False for a in env.agents}
         truncated = {a: False for a in env.agents}
         while env.agents:
-            actions = {a: model.predict(observations[a], deterministic=True)[0] for a in env.agents}
+            names = list(env.agents)
+            batch = np.stack([observations[a] for a in names])
+            masks = np.stack([infos[a]["action_mask"] for a in names])
+            actions = dict(zip(names, agent.act_batch(batch, masks)))
             observations, rewards, terminations, truncations, infos = env.step(actions)
             terminated.update(terminations)
             truncated.update(truncations)
-            env.render()
+            if render:
+                base.render()
+            if recorder:
+                recorder.add(base.frame())
             if all(terminated.get(a, False) or truncated.get(a, False) for a in terminated):
                 break
-        print(f"Episode {ep+1} finished")
+        stats.record(base.episode_stats())
+        if recorder:
+            recorder.end_episode()
+        print(f"Episode {ep+1} finished after {base.steps} steps")
+    print(stats.summary())
+    if recorder:
+        recorder.save(record_path)
+        print(f"Recorded {episodes} episodes to {record_path}")
     env.close()
+    return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train and evaluate Orc-Dwarf agents.")
+    parser.add_argument("--timesteps", type=int, default=None,
+                        help=f"training steps (default {TOTAL_TIMESTEPS}, or {SELF_PLAY_TIMESTEPS} "
+                             "per species per round with --self-play)")
+    parser.add_argument("--worlds", type=int, default=NUM_WORLDS,
+                        help="worlds stepped together (per worker when --workers > 0)")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS,
+                        help="rollout worker processes; 0 keeps everything in-process")
+    parser.add_argument("--eval-episodes", type=int, default=EVAL_EPISODES)
+    parser.add_argument("--self-play", action="store_true",
+                        help="train separate orc and dwarf policies against a league of snapshots")
+    parser.add_argument("--iterations", type=int, default=SELF_PLAY_ITERATIONS,
+                        help="self-play rounds")
+    parser.add_argument("--stats", default=STATS_PATH,
+                        help="where to write training metrics (.npz or .csv); empty to skip")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    model = train()
-    evaluate()
+    args = parse_args()
+    if args.self_play:
+        self_play(args.iterations, args.timesteps or SELF_PLAY_TIMESTEPS,
+                  num_worlds=args.worlds, workers=args.workers)
+    else:
+        model = train(args.timesteps or TOTAL_TIMESTEPS, num_worlds=args.worlds,
+                      num_workers=args.workers, stats_path=args.stats)
+        evaluate(episodes=args.eval_episodes)
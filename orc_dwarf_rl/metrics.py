@@ -0,0 +1,111 @@
+"""Episode statistics and training throughput for the Orc-Dwarf agents."""
+
+import csv
+import time
+
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+
+
+class EpisodeStats:
+    """Collects one row per finished episode plus training phase timings."""
+
+    FIELDS = ("length", "orcs_alive", "dwarfs_alive", "orc_kills", "dwarf_kills",
+              "orc_food", "dwarf_food")
+
+    def __init__(self):
+        self.episodes = []
+        # (seconds collecting, env steps, seconds training, gradient steps) per rollout
+        self.phases = []
+
+    def record(self, episode):
+        self.episodes.append(tuple(int(episode[f]) for f in self.FIELDS))
+
+    def record_phase(self, rollout_seconds, env_steps, train_seconds, gradient_steps):
+        self.phases.append((rollout_seconds, env_steps, train_seconds, gradient_steps))
+
+    def arrays(self):
+        episodes = np.array(self.episodes, dtype=np.int64).reshape(-1, len(self.FIELDS))
+        phases = np.array(self.phases, dtype=np.float64).reshape(-1, 4)
+        data = {name: episodes[:, i] for i, name in enumerate(self.FIELDS)}
+        data.update(
+            rollout_seconds=phases[:, 0], env_steps=phases[:, 1],
+            train_seconds=phases[:, 2], gradient_steps=phases[:, 3],
+        )
+        return data
+
+    def save(self, path):
+        """Write ``.csv`` (episodes only) or compressed ``.npz`` (everything)."""
+        if str(path).endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(self.FIELDS)
+                writer.writerows(self.episodes)
+        else:
+            np.savez_compressed(path, **self.arrays())
+
+    def summary(self):
+        data = self.arrays()
+        lines = []
+        if len(self.episodes):
+            n = len(self.episodes)
+            lines.append(
+                f"{n} episodes: mean length {data['length'].mean():.1f}, "
+                f"survivors orcs {data['orcs_alive'].mean():.2f} / dwarfs {data['dwarfs_alive'].mean():.2f}, "
+                f"kills orcs {data['orc_kills'].mean():.2f} / dwarfs {data['dwarf_kills'].mean():.2f}, "
+                f"food orcs {data['orc_food'].mean():.2f} / dwarfs {data['dwarf_food'].mean():.2f}"
+            )
+        if len(self.phases):
+            rollout, train = data["rollout_seconds"].sum(), data["train_seconds"].sum()
+            total = max(rollout + train, 1e-9)
+            lines.append(
+                f"env simulation {rollout:.1f}s ({100 * rollout / total:.0f}%, "
+                f"{data['env_steps'].sum() / max(rollout, 1e-9):.0f} env steps/s), "
+                f"gradient updates {train:.1f}s ({100 * train / total:.0f}%, "
+                f"{data['gradient_steps'].sum() / max(train, 1e-9):.1f} updates/s)"
+            )
+        return "\n".join(lines) if lines else "no statistics recorded"
+
+
+class ThroughputCallback(BaseCallback):
+    """Times rollout collection against policy updates and gathers the
+    ``world_episode`` infos emitted by the batched environments."""
+
+    def __init__(self, stats, verbose=0):
+        super().__init__(verbose)
+        self.stats = stats
+        self._pending = None
+
+    def _gradient_steps(self):
+        model = self.model
+        rollout = model.n_steps * model.n_envs
+        return model._n_updates * -(-rollout // model.batch_size)
+
+    def _flush(self):
+        """Close the previous rollout once its update has finished."""
+        if self._pending is not None:
+            start, rollout_seconds, env_steps, updates = self._pending
+            train_seconds = time.perf_counter() - start
+            self.stats.record_phase(rollout_seconds, env_steps, train_seconds,
+                                    self._gradient_steps() - updates)
+            self._pending = None
+
+    def _on_rollout_start(self):
+        self._flush()
+        self._rollout_start = time.perf_counter()
+        self._rollout_steps = self.num_timesteps
+
+    def _on_step(self):
+        for info in self.locals.get("infos", ()):
+            episode = info.get("world_episode")
+            if episode is not None:
+                self.stats.record(episode)
+        return True
+
+    def _on_rollout_end(self):
+        now = time.perf_counter()
+        self._pending = (now, now - self._rollout_start,
+                         self.num_timesteps - self._rollout_steps, self._gradient_steps())
+
+    def _on_training_end(self):
+        self._flush()
@@ -0,0 +1,92 @@
+"""Torch-free inference for trained Orc-Dwarf policies.
+
+``export_policy`` pulls the actor half of an SB3 ``MlpPolicy`` (the policy
+MLP plus the action head) out of a trained model into a small ``.npz``.
+``NumpyPolicy`` loads that file with nothing but NumPy and offers the same
+``act``/``act_batch`` interface as :class:`orc_dwarf_rl.agent.RLAgent`, so a
+game can run trained agents without importing torch or stable_baselines3.
+
+Run ``python -m orc_dwarf_rl.numpy_policy orc_dwarf_model.zip orc_dwarf_policy.npz``
+to convert a saved model.
+"""
+
+import sys
+from typing import Optional
+
+import numpy as np
+
+ACTIVATIONS = {
+    "identity": lambda x: x,
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "elu": lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0.0))),
+    "leakyrelu": lambda x: np.where(x > 0, x, 0.01 * x),
+}
+
+
+class NumpyPolicy:
+    """Deterministic MLP policy evaluated with NumPy."""
+
+    def __init__(self, weights, biases, activations):
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activations = [ACTIVATIONS[name] for name in activations]
+        self.activation_names = list(activations)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            names = [str(n) for n in data["activations"]]
+            weights = [data[f"w{i}"] for i in range(len(names))]
+            biases = [data[f"b{i}"] for i in range(len(names))]
+        return cls(weights, biases, names)
+
+    def save(self, path: str):
+        arrays = {f"w{i}": w for i, w in enumerate(self.weights)}
+        arrays.update({f"b{i}": b for i, b in enumerate(self.biases)})
+        np.savez_compressed(path, activations=np.array(self.activation_names), **arrays)
+
+    def logits(self, observations: np.ndarray) -> np.ndarray:
+        x = np.asarray(observations, dtype=np.float32)
+        for w, b, activation in zip(self.weights, self.biases, self.activations):
+            x = activation(x @ w + b)
+        return x
+
+    def act_batch(self, observations: np.ndarray, action_masks: Optional[np.ndarray] = None) -> np.ndarray:
+        """Greedy actions for a stacked ``(n_agents, obs_dim)`` batch."""
+        logits = self.logits(observations)
+        if action_masks is not None:
+            logits = np.where(action_masks, logits, -np.inf)
+        return logits.argmax(axis=-1)
+
+    def act(self, observation: np.ndarray, action_mask: Optional[np.ndarray] = None) -> int:
+        masks = None if action_mask is None else action_mask[None]
+        return int(self.act_batch(observation[None], masks)[0])
+
+
+def export_policy(model, path: str) -> NumpyPolicy:
+    """Write the actor of a trained SB3 ``MlpPolicy`` model to ``path``."""
+    policy = model.policy
+    weights, biases, activations = [], [], []
+    for layer in list(policy.mlp_extractor.policy_net) + [policy.action_net]:
+        name = type(layer).__name__.lower()
+        if name == "linear":
+            weights.append(layer.weight.detach().cpu().numpy().T)
+            biases.append(layer.bias.detach().cpu().numpy())
+            activations.append("identity")
+        elif name in ACTIVATIONS:
+            activations[-1] = name
+        else:
+            raise ValueError(f"Unsupported layer in policy network: {type(layer).__name__}")
+    exported = NumpyPolicy(weights, biases, activations)
+    exported.save(path)
+    return exported
+
+
+if __name__ == "__main__":
+    from orc_dwarf_rl.agent import RLAgent
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "orc_dwarf_model.zip"
+    target = sys.argv[2] if len(sys.argv) > 2 else "orc_dwarf_policy.npz"
+    RLAgent.load(source).export(target)
+    print(f"Exported {source} -> {target}")
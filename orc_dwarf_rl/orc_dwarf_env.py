@@ -1,6 +1,5 @@
 """Parallel environment for the Orc-Dwarf RL example."""
 
-import random
 import numpy as np
 
 try:
@@ -10,226 +9,202 @@ except ImportError:  # pragma: no cover - fallback for very old PettingZoo
     ParallelEnv = _old.ParallelEnv
 
 from gymnasium import spaces
+from orc_dwarf_rl import core, rendering
 from orc_dwarf_rl.config import (
     GRID_SIZE,
+    WRAP,
+    OBSTACLE_COUNT,
     NUM_ORCS,
     NUM_DWARFS,
-    MAX_ENERGY,
-    INITIAL_ENERGY,
-    DEFAULT_SIGHT,
-    DEFAULT_SPEED,
-    ATTACK_RANGE,
     RESOURCE_NODE_COUNT,
-    RESOURCE_ENERGY,
     MAX_STEPS,
 )
 
 
 class OrcDwarfEnv(ParallelEnv):
-    """Simple grid-based predator/prey environment using PettingZoo's parallel API."""
+    """Simple grid-based predator/prey environment using PettingZoo's parallel API.
 
-    metadata = {"name": "orc_dwarf_v0"}
+    The world is a single row of the :mod:`orc_dwarf_rl.core` arrays, so the
+    rules (and their cost) are those of ``BatchedOrcDwarfEnv``: every agent
+    acts on the same snapshot of the world.  ``grid_size``, ``wrap`` and
+    the obstacle layer describe the map; unless ``obstacles`` is given, a
+    layout of ``num_obstacles`` random cells is drawn once per env.
 
-    def __init__(self, num_orcs=NUM_ORCS, num_dwarfs=NUM_DWARFS):
+    ``render_mode`` ``"human"`` prints the ASCII grid, ``"ansi"`` returns it
+    as a string and ``"rgb_array"`` returns an image with ``render_scale``
+    pixels per cell; all of them come from the int-coded ``frame()``.
+    """
+
+    metadata = {"name": "orc_dwarf_v0", "render_modes": ["human", "ansi", "rgb_array"]}
+
+    def __init__(self, num_orcs=NUM_ORCS, num_dwarfs=NUM_DWARFS, grid_size=GRID_SIZE,
+                 wrap=WRAP, num_resources=RESOURCE_NODE_COUNT, obstacles=None,
+                 num_obstacles=OBSTACLE_COUNT, seed=None, render_mode=None, render_scale=8):
         super().__init__()
+        self.render_mode = render_mode
+        self.render_scale = render_scale
         self.num_orcs = num_orcs
         self.num_dwarfs = num_dwarfs
-        self.grid_size = GRID_SIZE
-        self.pos = {}
-        self.energy = {}
-        self.alive = {}
+        self.grid_size = grid_size
+        self.wrap = wrap
+        self.rng = np.random.default_rng(seed)
+        if obstacles is None and num_obstacles:
+            obstacles = core.random_obstacles(self.rng, grid_size, num_obstacles)
+        self.obstacles = obstacles
+        self._background = np.zeros((grid_size, grid_size), dtype=np.uint8)
+        if obstacles is not None:
+            self._background[obstacles] = rendering.OBSTACLE
+        self._frame = self._background.copy()
         self.steps = 0
-        self.resource_nodes = []
+        self.kills = {"orc": 0, "dwarf": 0}
+        self.food = {"orc": 0, "dwarf": 0}
 
         self.agents = [f"orc_{i}" for i in range(self.num_orcs)] + [f"dwarf_{i}" for i in range(self.num_dwarfs)]
         self.possible_agents = list(self.agents)
 
-        obs_dim = 9  # [x,y,energy,res_x,res_y,enemy_x,enemy_y,sight,speed]
+        # world state as one row of the core arrays; pos/energy/alive are
+        # indexed by the agent's position in ``possible_agents``
+        n = len(self.possible_agents)
+        self._is_orc = np.array([a.startswith("orc") for a in self.possible_agents])
+        self._pos = np.zeros((1, n, 2), dtype=np.int64)
+        self._energy = np.zeros((1, n), dtype=np.int64)
+        self._alive = np.zeros((1, n), dtype=bool)
+        self._resources = np.zeros((1, num_resources, 2), dtype=np.int64)
+        self._actions = np.zeros((1, n), dtype=np.int64)
+        self._obs = np.zeros((1, n, core.OBS_DIM), dtype=np.float32)
+        self._masks = np.ones((1, n, core.N_ACTIONS), dtype=bool)
+        self.pos, self.energy, self.alive = self._pos[0], self._energy[0], self._alive[0]
+        self.resources = self._resources[0]
+        self._index = {a: i for i, a in enumerate(self.possible_agents)}
+        self._obs_views = {a: self._obs[0, i] for a, i in self._index.items()}
+        self._mask_views = {a: self._masks[0, i] for a, i in self._index.items()}
+
+        # output dicts reused by every step; agents that left the episode in
+        # the previous step are dropped from them at the start of the next
+        self._observations = {}
+        self._rewards = {}
+        self._terminations = {}
+        self._truncations = {}
+        self._infos = {a: {"action_mask": self._mask_views[a]} for a in self.possible_agents}
+        self._live_infos = {}
+        self._departed = []
+
         self.observation_spaces = {
-            a: spaces.Box(low=-1.0, high=1.0, shape=(obs_dim,), dtype=np.float32) for a in self.agents
+            a: spaces.Box(low=-1.0, high=1.0, shape=(core.OBS_DIM,), dtype=np.float32) for a in self.agents
         }
-        self.action_spaces = {a: spaces.Discrete(9) for a in self.agents}
-
-    # ------------------------------------------------------------------
-    def _random_pos(self):
-        return (random.randrange(self.grid_size), random.randrange(self.grid_size))
-
-    def _spawn_resources(self):
-        self.resource_nodes = [self._random_pos() for _ in range(RESOURCE_NODE_COUNT)]
+        self.action_spaces = {a: spaces.Discrete(core.N_ACTIONS) for a in self.agents}
 
     # ------------------------------------------------------------------
     def reset(self, seed=None, options=None):
         if seed is not None:
-            random.seed(seed)
-            np.random.seed(seed)
+            self.rng = np.random.default_rng(seed)
         self.steps = 0
+        self.kills = {"orc": 0, "dwarf": 0}
+        self.food = {"orc": 0, "dwarf": 0}
         # Ensure all agents are present at the start of each episode.
-        self.agents = list(self.possible_agents)
-        self._spawn_resources()
-        self.pos = {a: self._random_pos() for a in self.agents}
-        self.energy = {a: INITIAL_ENERGY for a in self.agents}
-        self.alive = {a: True for a in self.agents}
-        observations = {a: self.observe(a) for a in self.agents}
-        return observations
+        self.agents[:] = self.possible_agents
+        core.reset_worlds(self.rng, self._pos, self._energy, self._alive, self._resources,
+                          self.grid_size, obstacles=self.obstacles)
+        self._departed.clear()
+        for outputs in (self._rewards, self._terminations, self._truncations):
+            outputs.clear()
+            outputs.update(dict.fromkeys(self.agents))
+        self._observations.clear()
+        self._observations.update(self._obs_views)
+        self._live_infos.clear()
+        self._live_infos.update(self._infos)
+        self._observe_all()
+        return self._observations, self._live_infos
 
     # ------------------------------------------------------------------
     def step(self, actions):
-        rewards = {a: 0.0 for a in self.agents}
-        terminations = {a: False for a in self.agents}
-        truncations = {a: False for a in self.agents}
-        infos = {a: {} for a in self.agents}
+        """Advance the world by one step.
+
+        The returned dicts are reused (and the observation arrays
+        overwritten) by the following ``step``; copy what you need to keep.
+        """
+        rewards, terminations, truncations = self._rewards, self._terminations, self._truncations
+        for a in self._departed:
+            del self._observations[a], rewards[a], terminations[a], truncations[a], self._live_infos[a]
+        self._departed.clear()
+
+        # agents without an action stay where they are
+        self._actions.fill(4)
+        for agent, action in actions.items():
+            self._actions[0, self._index[agent]] = action
+        reward, terminated, kills, eaten = core.step(
+            self.rng, self._pos, self._energy, self._alive, self._resources, self._is_orc,
+            self._actions, self.grid_size, self.wrap, self.obstacles,
+        )
         self.steps += 1
+        self.kills["orc"] += int(kills[0, self._is_orc].sum())
+        self.kills["dwarf"] += int(kills[0, ~self._is_orc].sum())
+        self.food["orc"] += int(eaten[0, self._is_orc].sum())
+        self.food["dwarf"] += int(eaten[0, ~self._is_orc].sum())
 
-        # movement
-        for agent, action in actions.items():
-            if not self.alive.get(agent, False):
-                continue
-            x, y = self.pos[agent]
-            dx, dy = 0, 0
-            if action == 0:
-                dy = -DEFAULT_SPEED
-            elif action == 1:
-                dy = DEFAULT_SPEED
-            elif action == 2:
-                dx = DEFAULT_SPEED
-            elif action == 3:
-                dx = -DEFAULT_SPEED
-            elif action == 5:  # toward resource
-                target = self._nearest_resource(x, y)
-                if target:
-                    dx, dy = self._direction_toward((x, y), target)
-            elif action == 6:  # toward enemy
-                target = self._nearest_enemy(agent)
-                if target:
-                    dx, dy = self._direction_toward((x, y), self.pos[target])
-            elif action == 7:  # flee enemy
-                target = self._nearest_enemy(agent)
-                if target:
-                    dx, dy = self._direction_away((x, y), self.pos[target])
-            # action 4 = stay still
-            self.pos[agent] = self._clamp_pos(x + dx, y + dy)
-
-        # attacks after movement
-        for agent, action in actions.items():
-            if not self.alive.get(agent, False):
-                continue
-            if action == 8:
-                enemy = self._nearest_enemy(agent)
-                if enemy and self._manhattan(self.pos[agent], self.pos[enemy]) <= ATTACK_RANGE:
-                    self.alive[enemy] = False
-                    rewards[agent] += 2.0
-                    rewards[enemy] -= 2.0
-
-        # resource collection and energy updates
-        for agent in list(self.agents):
-            if not self.alive.get(agent, False):
-                continue
-            rewards[agent] += 0.01  # living bonus
-            self.energy[agent] -= 1
-            x, y = self.pos[agent]
-            if (x, y) in self.resource_nodes:
-                rewards[agent] += 1.0
-                self.energy[agent] = min(MAX_ENERGY, self.energy[agent] + RESOURCE_ENERGY)
-                self.resource_nodes.remove((x, y))
-                self.resource_nodes.append(self._random_pos())
-            if self.energy[agent] <= 0 or not self.alive[agent]:
-                terminations[agent] = True
-                self.alive[agent] = False
-                rewards[agent] -= 5.0
-
-        if self.steps >= MAX_STEPS:
-            for agent in self.agents:
-                if not terminations[agent]:
-                    truncations[agent] = True
-
-        # remove dead agents from list
-        for agent in self.agents:
-            if terminations[agent] or truncations[agent]:
-                pass
-        self.agents = [a for a in self.agents if self.alive.get(a, False)]
-        observations = {a: self.observe(a) for a in self.agents}
-        return observations, rewards, terminations, truncations, infos
+        reward, terminated = reward[0].tolist(), terminated[0].tolist()
+        timed_out = self.steps >= MAX_STEPS
+        for a in self.agents:
+            i = self._index[a]
+            rewards[a] = reward[i]
+            terminations[a] = terminated[i]
+            truncations[a] = timed_out and not terminated[i]
+            if not self.alive[i]:
+                self._departed.append(a)
+        for a in self._departed:
+            self.agents.remove(a)
+        self._observe_all()
+        return self._observations, rewards, terminations, truncations, self._live_infos
 
     # ------------------------------------------------------------------
-    def _direction_toward(self, pos, target):
-        x, y = pos
-        tx, ty = target
-        dx = 1 if tx > x else -1 if tx < x else 0
-        dy = 1 if ty > y else -1 if ty < y else 0
-        return dx, dy
-
-    def _direction_away(self, pos, target):
-        dx, dy = self._direction_toward(pos, target)
-        return -dx, -dy
-
-    def _clamp_pos(self, x, y):
-        x = max(0, min(self.grid_size - 1, int(x)))
-        y = max(0, min(self.grid_size - 1, int(y)))
-        return (x, y)
-
-    def _manhattan(self, p1, p2):
-        return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
-
-    def _nearest_resource(self, x, y):
-        if not self.resource_nodes:
-            return None
-        return min(self.resource_nodes, key=lambda p: self._manhattan((x, y), p))
-
-    def _nearest_enemy(self, agent):
-        species = "orc" if agent.startswith("dwarf") else "dwarf"
-        enemies = [a for a in self.agents if a.startswith(species) and self.alive.get(a, False)]
-        if not enemies:
-            return None
-        x, y = self.pos[agent]
-        return min(enemies, key=lambda e: self._manhattan((x, y), self.pos[e]))
+    def episode_stats(self):
+        """Counters of the running episode, as recorded by ``metrics``."""
+        return {
+            "length": self.steps,
+            "orcs_alive": int(self.alive[self._is_orc].sum()),
+            "dwarfs_alive": int(self.alive[~self._is_orc].sum()),
+            "orc_kills": self.kills["orc"],
+            "dwarf_kills": self.kills["dwarf"],
+            "orc_food": self.food["orc"],
+            "dwarf_food": self.food["dwarf"],
+        }
+
+    def _observe_all(self):
+        """Build every observation and action mask in one vectorised pass.
+
+        The returned arrays are views into a buffer that is overwritten by
+        the next ``reset``/``step``; copy them to keep them longer.
+        """
+        core.observe(self._pos, self._energy, self._alive, self._resources, self._is_orc,
+                     self.grid_size, self._obs, self._masks, self.wrap, self.obstacles)
+        return self._observations
 
-    # ------------------------------------------------------------------
     def observe(self, agent):
-        x, y = self.pos[agent]
-        norm_x = x / (self.grid_size - 1)
-        norm_y = y / (self.grid_size - 1)
-        energy = self.energy[agent] / MAX_ENERGY
-
-        res = self._nearest_resource(x, y)
-        if res:
-            res_dx = (res[0] - x) / self.grid_size
-            res_dy = (res[1] - y) / self.grid_size
-        else:
-            res_dx = res_dy = 0.0
-
-        enemy = self._nearest_enemy(agent)
-        if enemy:
-            ex, ey = self.pos[enemy]
-            enemy_dx = (ex - x) / self.grid_size
-            enemy_dy = (ey - y) / self.grid_size
-        else:
-            enemy_dx = enemy_dy = 0.0
-
-        sight = DEFAULT_SIGHT / self.grid_size
-        speed = DEFAULT_SPEED
-        obs = np.array(
-            [
-                norm_x,
-                norm_y,
-                energy,
-                res_dx,
-                res_dy,
-                enemy_dx,
-                enemy_dy,
-                sight,
-                speed,
-            ],
-            dtype=np.float32,
-        )
-        return obs
+        return self._obs[0, self._index[agent]].copy()
+
+    def action_masks(self):
+        """Valid-action mask of every live agent, also found in ``infos``."""
+        return {a: self._mask_views[a] for a in self.agents}
 
     # ------------------------------------------------------------------
+    def frame(self):
+        """Int-coded ``(grid_size, grid_size)`` grid, see :mod:`orc_dwarf_rl.rendering`.
+
+        The array is overwritten by the next call.
+        """
+        frame = self._frame
+        frame[:] = self._background
+        frame[self.resources[:, 1], self.resources[:, 0]] = rendering.RESOURCE
+        live = self.alive
+        frame[self.pos[live, 1], self.pos[live, 0]] = np.where(
+            self._is_orc[live], rendering.ORC, rendering.DWARF)
+        return frame
+
     def render(self):
-        grid = [["." for _ in range(self.grid_size)] for _ in range(self.grid_size)]
-        for rx, ry in self.resource_nodes:
-            grid[ry][rx] = "R"
-        for a in self.agents:
-            x, y = self.pos[a]
-            grid[y][x] = "O" if a.startswith("orc") else "D"
-        print("\n".join("".join(row) for row in grid))
+        if self.render_mode == "rgb_array":
+            return rendering.to_rgb(self.frame(), self.render_scale)
+        text = rendering.to_text(self.frame())
+        if self.render_mode == "ansi":
+            return text
+        print(text)
         print()
@@ -0,0 +1,152 @@
+"""Multi-process rollout workers sharing their buffers with the learner."""
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+from gymnasium import spaces
+
+from orc_dwarf_rl import core
+from orc_dwarf_rl.batched_env import ArrayVecEnv, BatchedOrcDwarfEnv
+from orc_dwarf_rl.config import NUM_ORCS, NUM_DWARFS
+
+
+def _layout(num_envs):
+    """Offsets of the obs / reward / done / action / mask arrays in the shared block."""
+    offset = 0
+    layout = []
+    for name, dtype, shape in (
+        ("obs", np.float32, (num_envs, core.OBS_DIM)),
+        ("rewards", np.float32, (num_envs,)),
+        ("dones", np.bool_, (num_envs,)),
+        ("actions", np.int64, (num_envs,)),
+        ("masks", np.bool_, (num_envs, core.N_ACTIONS)),
+    ):
+        layout.append((name, dtype, shape, offset))
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+        offset += -offset % 8
+    return layout, offset
+
+
+def _buffers(shm, num_envs):
+    layout, _ = _layout(num_envs)
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        for name, dtype, shape, offset in layout
+    }
+
+
+def _worker(remote, shm_name, num_envs, start, stop, env_kwargs):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    views = _buffers(shm, num_envs)
+    env = BatchedOrcDwarfEnv(**env_kwargs)
+    window = slice(start, stop)
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                obs, rewards, dones, infos = env.step(views["actions"][window])
+                views["obs"][window] = obs
+                views["rewards"][window] = rewards
+                views["dones"][window] = dones
+                views["masks"][window] = env.action_masks()
+                remote.send([(i, infos[i]) for i in np.flatnonzero(dones)])
+            elif cmd == "reset":
+                env.seed(data)
+                views["obs"][window] = env.reset()
+                views["masks"][window] = env.action_masks()
+                remote.send(None)
+            elif cmd == "close":
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        env.close()
+        del views
+        shm.close()
+        remote.close()
+
+
+class SharedMemoryVecEnv(ArrayVecEnv):
+    """``BatchedOrcDwarfEnv`` split over ``num_workers`` processes.
+
+    Each worker owns ``worlds_per_worker`` worlds and reads its actions from
+    and writes its observations, rewards, dones and action masks into one
+    shared-memory block, so only the sparse episode-end infos travel through
+    the pipes.
+    Worlds reset themselves inside the workers.  Extra keyword arguments
+    (map size, topology, obstacles) are passed on to every worker's
+    ``BatchedOrcDwarfEnv``.
+    """
+
+    def __init__(self, num_workers=4, worlds_per_worker=8, num_orcs=NUM_ORCS,
+                 num_dwarfs=NUM_DWARFS, start_method=None, **env_kwargs):
+        self.num_workers = num_workers
+        per_worker = worlds_per_worker * (num_orcs + num_dwarfs)
+        num_envs = num_workers * per_worker
+
+        _, size = _layout(num_envs)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.buffers = _buffers(self.shm, num_envs)
+
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+        self.remotes, self.processes = [], []
+        env_kwargs.update(num_worlds=worlds_per_worker, num_orcs=num_orcs, num_dwarfs=num_dwarfs)
+        for w in range(num_workers):
+            remote, work_remote = ctx.Pipe()
+            args = (work_remote, self.shm.name, num_envs, w * per_worker,
+                    (w + 1) * per_worker, env_kwargs)
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            work_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+        self.per_worker = per_worker
+        self.closed = False
+
+        observation_space = spaces.Box(low=-1.0, high=1.0, shape=(core.OBS_DIM,), dtype=np.float32)
+        super().__init__(num_envs, observation_space, spaces.Discrete(core.N_ACTIONS))
+
+    # ------------------------------------------------------------------
+    def reset(self):
+        for w, remote in enumerate(self.remotes):
+            seed = self._seeds[w * self.per_worker]
+            remote.send(("reset", seed))
+        for remote in self.remotes:
+            remote.recv()
+        self._seeds = [None] * self.num_envs
+        return self.buffers["obs"].copy()
+
+    def step_async(self, actions):
+        self.buffers["actions"][:] = actions
+        for remote in self.remotes:
+            remote.send(("step", None))
+
+    def step_wait(self):
+        infos = [{} for _ in range(self.num_envs)]
+        for w, remote in enumerate(self.remotes):
+            for i, info in remote.recv():
+                infos[w * self.per_worker + i] = info
+        return (
+            self.buffers["obs"].copy(),
+            self.buffers["rewards"].copy(),
+            self.buffers["dones"].copy(),
+            infos,
+        )
+
+    def action_masks(self):
+        return self.buffers["masks"].copy()
+
+    def close(self):
+        if self.closed:
+            return
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        self.buffers = None
+        self.shm.close()
+        self.shm.unlink()
+        self.closed = True
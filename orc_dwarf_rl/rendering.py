@@ -0,0 +1,82 @@
+"""Array frames of the Orc-Dwarf grid and compressed episode recordings.
+
+A frame is a ``(grid_size, grid_size)`` ``uint8`` array indexed ``[y, x]``
+holding one of the cell codes below.  ``to_rgb`` and ``to_text`` turn
+frames into images or the ASCII grid with a single lookup, and
+``EpisodeRecorder`` stores whole episodes of frames in one ``.npz`` so they
+can be inspected offline.
+
+Run ``python -m orc_dwarf_rl.rendering orc_dwarf_episodes.npz [episode]`` to
+play a recording back in the terminal.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+EMPTY, OBSTACLE, RESOURCE, ORC, DWARF = range(5)
+CELL_CHARS = np.array(list(".#ROD"))
+PALETTE = np.array([
+    (0, 0, 0),        # empty
+    (128, 128, 128),  # obstacle
+    (0, 200, 0),      # resource
+    (255, 0, 0),      # orc
+    (0, 0, 255),      # dwarf
+], dtype=np.uint8)
+
+
+def to_rgb(frames, scale=1):
+    """``(..., H, W)`` cell codes -> ``(..., H*scale, W*scale, 3)`` image."""
+    rgb = PALETTE[frames]
+    if scale > 1:
+        rgb = rgb.repeat(scale, axis=-3).repeat(scale, axis=-2)
+    return rgb
+
+
+def to_text(frame):
+    """ASCII grid of one frame, one row per line."""
+    return "\n".join("".join(row) for row in CELL_CHARS[frame])
+
+
+class EpisodeRecorder:
+    """Collects frames episode by episode and writes them to a ``.npz``."""
+
+    def __init__(self):
+        self.frames = []
+        self.lengths = []
+        self._current = 0
+
+    def add(self, frame):
+        self.frames.append(np.array(frame, dtype=np.uint8))
+        self._current += 1
+
+    def end_episode(self):
+        if self._current:
+            self.lengths.append(self._current)
+            self._current = 0
+
+    def save(self, path):
+        self.end_episode()
+        frames = np.stack(self.frames) if self.frames else np.zeros((0, 0, 0), dtype=np.uint8)
+        np.savez_compressed(path, frames=frames, lengths=np.array(self.lengths, dtype=np.int64))
+
+
+def load_episodes(path):
+    """List of ``(T, H, W)`` frame arrays, one per recorded episode."""
+    with np.load(path) as data:
+        frames, lengths = data["frames"], data["lengths"]
+    return np.split(frames, np.cumsum(lengths)[:-1])
+
+
+def play(path, episode=0, delay=0.1):
+    for t, frame in enumerate(load_episodes(path)[episode]):
+        print(f"step {t}")
+        print(to_text(frame))
+        print()
+        time.sleep(delay)
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "orc_dwarf_episodes.npz"
+    play(source, int(sys.argv[2]) if len(sys.argv) > 2 else 0)
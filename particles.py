@@ -0,0 +1,69 @@
+# particles.py
+
+import numpy as np
+import pygame
+from config import *
+
+
+class ParticlePool:
+    """Fixed-capacity particle system held in NumPy arrays.
+
+    Live particles occupy the first ``count`` rows of the position, velocity
+    and life arrays; ``update`` moves them all at once and compacts the
+    survivors to the front.  Each particle is drawn with one of ``levels``
+    pre-rendered sprites of decreasing alpha, so a frame needs no surface
+    allocation and a single ``Surface.blits`` call.  Spawns beyond
+    ``capacity`` are dropped.
+    """
+
+    def __init__(self, capacity=KILL_PARTICLE_CAPACITY, lifetime=KILL_PARTICLE_LIFETIME,
+                 color=KILL_PARTICLE_COLOR, size=KILL_PARTICLE_SIZE, levels=32):
+        self.capacity = capacity
+        self.lifetime = lifetime
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.life = np.zeros(capacity)
+        self.count = 0
+        self.rng = np.random.default_rng()
+        self.ramp = []
+        for level in range(levels):
+            surf = pygame.Surface((size, size), pygame.SRCALPHA)
+            surf.fill((*color, int(255 * level / (levels - 1))))
+            self.ramp.append(surf)
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, x, y, n, speed):
+        """Add ``n`` particles at pixel ``(x, y)`` with random velocities of
+        up to ``speed`` pixels per update on each axis."""
+        n = min(n, self.capacity - self.count)
+        new = slice(self.count, self.count + n)
+        self.pos[new] = (x, y)
+        self.vel[new] = self.rng.uniform(-1, 1, (n, 2)) * speed
+        self.life[new] = self.lifetime
+        self.count += n
+
+    def update(self, dt):
+        """Move every particle one step, age it by ``dt`` seconds and drop
+        the expired ones."""
+        live = slice(0, self.count)
+        self.pos[live] += self.vel[live]
+        self.life[live] -= dt
+        keep = np.flatnonzero(self.life[live] > 0)
+        k = len(keep)
+        if k < self.count:
+            self.pos[:k] = self.pos[keep]
+            self.vel[:k] = self.vel[keep]
+            self.life[:k] = self.life[keep]
+            self.count = k
+
+    def draw(self, screen):
+        """Blit all particles and return the rects they cover."""
+        if not self.count:
+            return []
+        live = slice(0, self.count)
+        top = len(self.ramp) - 1
+        levels = np.clip(self.life[live] / self.lifetime * top, 0, top).astype(int)
+        sprites = [self.ramp[level] for level in levels.tolist()]
+        return screen.blits(zip(sprites, self.pos[live].astype(int).tolist()))
@@ -0,0 +1,165 @@
+# replay.py
+
+import io
+import json
+import zipfile
+from bisect import bisect_right
+
+import numpy as np
+from config import *
+from agent import Orc
+
+# energies are stored as integer hundredths so deltas add up exactly
+ENERGY_SCALE = 100
+
+
+def _pack(arrays):
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+class ReplayRecorder:
+    """Write a run turn by turn into a chunked, compressed replay file.
+
+    The file is a zip archive holding ``meta.json`` (grid size and obstacle
+    layout) and one ``.npz`` member per ``chunk_turns`` turns.  A chunk holds
+    a keyframe with the full agent state at its first turn followed by the
+    per-turn differences of position, energy and alive flags, plus the
+    resource nodes, day/weather and logged events of each turn.  Agents are
+    identified by their index in main.py's append-only ``agents`` list.
+    """
+
+    def __init__(self, path, obstacles, chunk_turns=REPLAY_CHUNK_TURNS):
+        self.chunk_turns = chunk_turns
+        self.zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        self.zip.writestr("meta.json", json.dumps({
+            "grid_size": GRID_SIZE,
+            "obstacles": [list(p) for p in obstacles],
+            "weather_states": WEATHER_STATES,
+        }))
+        self.is_orc = []
+        self.pending_events = []
+        self._start_chunk()
+
+    def _start_chunk(self):
+        self.turns, self.states, self.resources = [], [], []
+        self.day, self.weather, self.events = [], [], []
+
+    def event(self, msg):
+        """Attach a log message to the next recorded turn."""
+        self.pending_events.append(msg)
+
+    def record(self, turn, agents, resource_nodes, day, weather):
+        """Store the state at the end of ``turn``."""
+        n = len(agents)
+        self.is_orc.extend(isinstance(a, Orc) for a in agents[len(self.is_orc):])
+        self.states.append((
+            np.fromiter((a.x for a in agents), np.int16, n),
+            np.fromiter((a.y for a in agents), np.int16, n),
+            np.fromiter((round(a.energy * ENERGY_SCALE) for a in agents), np.int32, n),
+            np.fromiter((a.alive for a in agents), np.int8, n),
+        ))
+        self.turns.append(turn)
+        self.resources.append(list(resource_nodes))
+        self.day.append(day)
+        self.weather.append(WEATHER_STATES.index(weather))
+        self.events.extend((turn, msg) for msg in self.pending_events)
+        self.pending_events.clear()
+        if len(self.turns) >= self.chunk_turns:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered turns as one chunk."""
+        if not self.turns:
+            return
+        t, n = len(self.turns), len(self.is_orc)
+        full = []
+        for field in range(4):
+            grid = np.zeros((t, n), dtype=self.states[0][field].dtype)
+            for row, state in enumerate(self.states):
+                grid[row, :len(state[field])] = state[field]
+            full.append(grid)
+        r = max(len(res) for res in self.resources)
+        resources = np.full((t, r, 2), -1, dtype=np.int16)
+        for row, res in enumerate(self.resources):
+            if res:
+                resources[row, :len(res)] = res
+        arrays = {"turns": np.array(self.turns, dtype=np.int64),
+                  "is_orc": np.array(self.is_orc, dtype=bool),
+                  "resources": resources,
+                  "day": np.array(self.day, dtype=bool),
+                  "weather": np.array(self.weather, dtype=np.int8),
+                  "event_turns": np.array([e[0] for e in self.events], dtype=np.int64),
+                  "events": np.array([e[1] for e in self.events], dtype=str)}
+        for name, grid in zip(("x", "y", "energy", "alive"), full):
+            arrays[name + "_key"] = grid[0]
+            arrays[name + "_delta"] = np.diff(grid, axis=0)
+        first, last = self.turns[0], self.turns[-1]
+        self.zip.writestr(f"chunk_{first:08d}_{last:08d}.npz", _pack(arrays))
+        self._start_chunk()
+
+    def close(self):
+        self.flush()
+        self.zip.close()
+
+
+class Replay:
+    """Random access to a file written by ``ReplayRecorder``.
+
+    ``state(turn)`` decodes only the chunk containing ``turn`` (starting from
+    its keyframe) and keeps the last decoded chunk, so seeking is cheap and
+    nothing is re-simulated.
+    """
+
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path)
+        meta = json.loads(self.zip.read("meta.json"))
+        self.grid_size = meta["grid_size"]
+        self.obstacles = [tuple(p) for p in meta["obstacles"]]
+        self.weather_states = meta["weather_states"]
+        self.chunks = []
+        for name in sorted(n for n in self.zip.namelist() if n.startswith("chunk_")):
+            first, last = name[len("chunk_"):-len(".npz")].split("_")
+            self.chunks.append((int(first), int(last), name))
+        if not self.chunks:
+            self.zip.close()
+            raise ValueError("replay has no recorded turns")
+        self.first_turn = self.chunks[0][0]
+        self.last_turn = self.chunks[-1][1]
+        self.keyframes = [first for first, _, _ in self.chunks]
+        self._cached = (None, None)
+
+    def _decode(self, name):
+        if self._cached[0] == name:
+            return self._cached[1]
+        with np.load(io.BytesIO(self.zip.read(name))) as data:
+            chunk = {key: data[key] for key in data.files}
+        for field in ("x", "y", "energy", "alive"):
+            key, delta = chunk.pop(field + "_key"), chunk.pop(field + "_delta")
+            chunk[field] = np.concatenate([key[None], key + np.cumsum(delta, axis=0)])
+        chunk["energy"] = chunk["energy"] / ENERGY_SCALE
+        chunk["alive"] = chunk["alive"].astype(bool)
+        self._cached = (name, chunk)
+        return chunk
+
+    def state(self, turn):
+        """Snapshot of ``turn`` (clamped to the recorded range) as a dict."""
+        turn = min(max(turn, self.first_turn), self.last_turn)
+        _, _, name = self.chunks[max(0, bisect_right(self.keyframes, turn) - 1)]
+        chunk = self._decode(name)
+        i = int(np.searchsorted(chunk["turns"], turn))
+        res = chunk["resources"][i]
+        upto = chunk["event_turns"] <= chunk["turns"][i]
+        return {
+            "turn": int(chunk["turns"][i]),
+            "x": chunk["x"][i],
+            "y": chunk["y"][i],
+            "energy": chunk["energy"][i],
+            "alive": chunk["alive"][i],
+            "is_orc": chunk["is_orc"],
+            "resources": [tuple(p) for p in res[res[:, 0] >= 0].tolist()],
+            "day": bool(chunk["day"][i]),
+            "weather": self.weather_states[chunk["weather"][i]],
+            "events": chunk["events"][upto].tolist(),
+        }
@@ -0,0 +1,119 @@
+# replay_viewer.py
+
+import sys
+import pygame
+from config import *
+from replay import Replay
+
+# Controls: SPACE pause, LEFT/RIGHT step one turn, PAGEUP/PAGEDOWN jump a
+# keyframe, UP/DOWN double/halve the speed, HOME/END, click the timeline.
+
+try:
+    replay = Replay(sys.argv[1] if len(sys.argv) > 1 else REPLAY_FILE)
+except ValueError as e:
+    sys.exit(f"replay_viewer: {e}")
+map_px = replay.grid_size * CELL_SIZE
+timeline_y = map_px + UI_HEIGHT // 2 + 10
+
+pygame.init()
+screen = pygame.display.set_mode((map_px, map_px + UI_HEIGHT + 20))
+pygame.display.set_caption("Agent Simulation replay")
+clock = pygame.time.Clock()
+font = pygame.font.SysFont(None, 20)
+
+orc_img = pygame.transform.scale(pygame.image.load("assets/orc.png"), (CELL_SIZE, CELL_SIZE))
+dwarf_img = pygame.transform.scale(pygame.image.load("assets/dwarf.png"), (CELL_SIZE, CELL_SIZE))
+
+position = float(replay.first_turn)
+speed = 1.0  # turns per frame at FPS
+playing = True
+
+
+def seek(turn):
+    """Clamp a turn to the recorded range."""
+    return float(min(max(turn, replay.first_turn), replay.last_turn))
+
+
+def keyframe_jump(direction):
+    """Turn of the previous/next keyframe relative to the current turn."""
+    turn = int(position)
+    if direction > 0:
+        later = [k for k in replay.keyframes if k > turn]
+        return later[0] if later else replay.last_turn
+    earlier = [k for k in replay.keyframes if k < turn]
+    return earlier[-1] if earlier else replay.first_turn
+
+
+def draw(state):
+    """Draw one recorded turn."""
+    bg = DAY_BG_COLOR if state["day"] else NIGHT_BG_COLOR
+    if state["weather"] == "storm":
+        bg = (20, 20, 60)
+    screen.fill(bg)
+    for rx, ry in state["resources"]:
+        pygame.draw.circle(screen, (0, 255, 0),
+                           (rx*CELL_SIZE + CELL_SIZE//2, ry*CELL_SIZE + CELL_SIZE//2), CELL_SIZE//3)
+    for ox, oy in replay.obstacles:
+        pygame.draw.rect(screen, OBSTACLE_COLOR, (ox*CELL_SIZE, oy*CELL_SIZE, CELL_SIZE, CELL_SIZE))
+    orcs_predators = state["day"]
+    for x, y, orc in zip(state["x"][state["alive"]], state["y"][state["alive"]],
+                         state["is_orc"][state["alive"]]):
+        xpix, ypix = int(x) * CELL_SIZE, int(y) * CELL_SIZE
+        screen.blit(orc_img if orc else dwarf_img, (xpix, ypix))
+        if orc == orcs_predators:
+            pygame.draw.rect(screen, PREDATOR_HIGHLIGHT, (xpix, ypix, CELL_SIZE, CELL_SIZE), 2)
+
+    for i, msg in enumerate(state["events"][-LOG_OVERLAY_MAX:]):
+        screen.blit(font.render(msg[-40:], True, UI_FONT_COLOR), (10, 10 + i*18))
+
+    alive, is_orc = state["alive"], state["is_orc"]
+    status = (f"Turn:{state['turn']}/{replay.last_turn} "
+              f"Orcs:{int((alive & is_orc).sum())} Dwarves:{int((alive & ~is_orc).sum())} "
+              f"Day:{state['day']} Weather:{state['weather']} "
+              f"Speed:x{speed:g} {'Playing' if playing else 'Paused'}")
+    screen.blit(font.render(status, True, UI_FONT_COLOR), (10, map_px + 8))
+
+    span = max(1, replay.last_turn - replay.first_turn)
+    pygame.draw.line(screen, UI_FONT_COLOR, (10, timeline_y), (map_px - 10, timeline_y), 2)
+    for k in replay.keyframes:
+        kx = 10 + (k - replay.first_turn) / span * (map_px - 20)
+        pygame.draw.line(screen, OBSTACLE_COLOR, (kx, timeline_y - 4), (kx, timeline_y + 4))
+    cx = 10 + (state["turn"] - replay.first_turn) / span * (map_px - 20)
+    pygame.draw.circle(screen, PREDATOR_HIGHLIGHT, (int(cx), timeline_y), 6)
+
+
+running = True
+while running:
+    clock.tick(FPS)
+    for e in pygame.event.get():
+        if e.type == pygame.QUIT:
+            running = False
+        if e.type == pygame.KEYDOWN:
+            if e.key == pygame.K_SPACE:
+                playing = not playing
+            elif e.key == pygame.K_RIGHT:
+                position = seek(int(position) + 1)
+            elif e.key == pygame.K_LEFT:
+                position = seek(int(position) - 1)
+            elif e.key == pygame.K_PAGEDOWN:
+                position = seek(keyframe_jump(1))
+            elif e.key == pygame.K_PAGEUP:
+                position = seek(keyframe_jump(-1))
+            elif e.key == pygame.K_UP:
+                speed = min(speed * 2, 1024)
+            elif e.key == pygame.K_DOWN:
+                speed = max(speed / 2, 1 / 16)
+            elif e.key == pygame.K_HOME:
+                position = seek(replay.first_turn)
+            elif e.key == pygame.K_END:
+                position = seek(replay.last_turn)
+        if e.type == pygame.MOUSEBUTTONDOWN and e.pos[1] >= map_px:
+            frac = (e.pos[0] - 10) / max(1, map_px - 20)
+            position = seek(round(replay.first_turn + frac * (replay.last_turn - replay.first_turn)))
+
+    if playing:
+        position = seek(position + speed)
+    draw(replay.state(int(position)))
+    pygame.display.flip()
+
+pygame.quit()